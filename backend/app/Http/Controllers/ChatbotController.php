@@ -20,7 +20,12 @@ public function message(Request $request)
             }
 
             $fastApiUrl = env('FASTAPI_URL', 'http://127.0.0.1:5000');
-            $response = Http::post("$fastApiUrl/rag", [
+
+            if ($request->boolean('stream') || str_contains($request->header('Accept', ''), 'text/event-stream')) {
+                return $this->streamMessage("$fastApiUrl/rag/stream", $query, $this->requestId($request));
+            }
+
+            $response = Http::withHeaders(['X-Request-ID' => $this->requestId($request)])->post("$fastApiUrl/rag", [
                 'query' => $query
             ]);
 
@@ -39,4 +44,35 @@ public function message(Request $request)
             ], 500);
         }
     }
+
+    // Relays FastAPI's Server-Sent Events to the browser as they arrive
+    private function streamMessage(string $url, string $query, string $requestId)
+    {
+        $upstream = Http::withOptions(['stream' => true])
+            ->withHeaders(['Accept' => 'text/event-stream', 'X-Request-ID' => $requestId])
+            ->timeout(120)
+            ->post($url, ['query' => $query]);
+
+        if (!$upstream->successful()) {
+            return response()->json([
+                'response' => '❌ AI backend error: ' . $upstream->body()
+            ], 500);
+        }
+
+        $body = $upstream->toPsrResponse()->getBody();
+
+        return response()->stream(function () use ($body) {
+            while (!$body->eof()) {
+                echo $body->read(1024);
+                if (ob_get_level() > 0) {
+                    ob_flush();
+                }
+                flush();
+            }
+        }, 200, [
+            'Content-Type' => 'text/event-stream',
+            'Cache-Control' => 'no-cache',
+            'X-Accel-Buffering' => 'no',
+        ]);
+    }
 }
@@ -2,7 +2,18 @@
 
 namespace App\Http\Controllers;
 
+use Illuminate\Http\Request;
+use Illuminate\Support\Str;
+
 abstract class Controller
 {
-    //
+    // Reuses the caller's X-Request-ID (or mints one) so FastAPI logs can be joined with ours
+    protected function requestId(Request $request): string
+    {
+        if (!$request->headers->has('X-Request-ID')) {
+            $request->headers->set('X-Request-ID', (string) Str::uuid());
+        }
+
+        return $request->header('X-Request-ID');
+    }
 }
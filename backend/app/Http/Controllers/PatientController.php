@@ -5,6 +5,8 @@
 use Illuminate\Http\Request;
 use App\Models\Patient;
 use Carbon\Carbon;
+use Illuminate\Support\Facades\Http;
+use Illuminate\Support\Facades\Log;
 
 class PatientController extends Controller
 {
@@ -158,6 +160,20 @@ public function update(Request $request, $id)
 
     $patient->save();
 
+    // Cached AI answers for this patient were built from the old record
+    try {
+        $fastApiUrl = env('FASTAPI_URL', 'http://127.0.0.1:5000');
+        Http::timeout(2)
+            ->withHeaders([
+                'X-Request-ID' => $this->requestId($request),
+                'X-Internal-Token' => env('INTERNAL_API_TOKEN', ''),
+            ])
+            ->post("$fastApiUrl/cache/patients/{$patient->id}/invalidate")
+            ->throw(); // 4xx/5xx don't throw on their own
+    } catch (\Throwable $e) {
+        Log::warning('Failed to invalidate AI response cache for patient ' . $patient->id . ': ' . $e->getMessage());
+    }
+
     return response()->json(['message' => 'Patient updated', 'data' => $patient], 200);
 }
 
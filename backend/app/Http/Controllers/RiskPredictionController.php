@@ -37,6 +37,7 @@ public function predict(Request $request)
 
     $fastApiUrl = env('FASTAPI_URL', 'http://127.0.0.1:5000');
     $response = Http::timeout(10)
+    ->withHeaders(['X-Request-ID' => $this->requestId($request)])
     ->acceptJson()
     ->asJson()
     ->post("$fastApiUrl/predict", $dataForFastAPI);
@@ -54,4 +55,48 @@ public function predict(Request $request)
         'details' => $response->body()
     ], 500);
 }
+
+public function predictBatch(Request $request)
+{
+    $validated = $request->validate([
+        'patients' => 'required|array|min:1',
+        'patients.*.HbA1c1' => 'required|numeric',
+        'patients.*.HbA1c2' => 'required|numeric',
+        'patients.*.FVG1' => 'required|numeric',
+        'patients.*.FVG2' => 'required|numeric',
+        'patients.*.Avg_FVG_1_2' => 'required|numeric',
+        'patients.*.ReductionA' => 'required|numeric',
+    ]);
+
+    // One row per patient in the order of the risk model's feature_names_in_:
+    // HbA1c2, HbA1c1, FVG1, FVG2, Avg_FVG_1_2, Reduction (%)
+    $rows = array_map(fn ($patient) => [
+        (float) $patient['HbA1c2'],
+        (float) $patient['HbA1c1'],
+        (float) $patient['FVG1'],
+        (float) $patient['FVG2'],
+        (float) $patient['Avg_FVG_1_2'],
+        (float) $patient['ReductionA'],
+    ], $validated['patients']);
+
+    $fastApiUrl = env('FASTAPI_URL', 'http://127.0.0.1:5000');
+    $response = Http::timeout(60)
+    ->withHeaders(['X-Request-ID' => $this->requestId($request)])
+    ->acceptJson()
+    ->asJson()
+    ->post("$fastApiUrl/predict/batch", ['rows' => $rows]);
+
+    if ($response->successful()) {
+        return response()->json([
+            'success' => true,
+            'predictions' => $response->json('predictions')
+        ]);
+    }
+
+    return response()->json([
+        'success' => false,
+        'error' => 'Failed to get batch predictions from FastAPI.',
+        'details' => $response->body()
+    ], 500);
+}
 }
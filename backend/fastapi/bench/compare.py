@@ -0,0 +1,89 @@
+"""Compare a benchmark result file against a baseline and flag regressions.
+
+    python bench/compare.py bench/results/baseline.json bench/results/latest.json --threshold 0.2
+
+Exits 1 when any endpoint/concurrency pair got slower or lost throughput
+beyond the threshold, fails more often than in the baseline (in-band RAG
+errors included), or worker memory grew beyond the threshold.
+"""
+import argparse
+import json
+import sys
+
+# metric -> True when a larger value is worse
+LATENCY_METRICS = {"p50_ms": True, "p95_ms": True, "p99_ms": True, "throughput_rps": False}
+
+
+def load(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def worse(base, current, higher_is_worse: bool, threshold: float, min_delta: float) -> bool:
+    if base is None or current is None:
+        return False
+    delta = current - base if higher_is_worse else base - current
+    # The absolute floor keeps millisecond jitter on fast endpoints from failing the run
+    return delta > min_delta and delta > abs(base) * threshold
+
+
+def error_rate(run: dict) -> float:
+    # Older result files only carry the counts
+    if "error_rate" in run:
+        return run["error_rate"]
+    return run["errors"] / run["requests"] if run["requests"] else 0.0
+
+
+def compare(baseline: dict, current: dict, threshold=0.2, min_delta_ms=5.0) -> list:
+    """Return one human-readable line per regression; empty means no regressions."""
+    regressions = []
+    base_runs = {(r["path"], r["concurrency"]): r for r in baseline["results"]}
+
+    for run in current["results"]:
+        label = f"{run['path']} @ c={run['concurrency']}"
+        reason = f" (first error: {run['first_error']})" if run.get("first_error") else ""
+
+        # A run where every request failed has no latencies to compare, whatever the baseline says
+        if run["requests"] and run["errors"] == run["requests"]:
+            regressions.append(f"{label}: all {run['requests']} requests failed{reason}")
+            continue
+
+        base = base_runs.get((run["path"], run["concurrency"]))
+        if base is None:
+            continue
+
+        for metric, higher_is_worse in LATENCY_METRICS.items():
+            min_delta = min_delta_ms if metric.endswith("_ms") else 0.0
+            if worse(base.get(metric), run.get(metric), higher_is_worse, threshold, min_delta):
+                regressions.append(f"{label}: {metric} {base[metric]} -> {run[metric]}")
+
+        # Rates, so runs with different --requests-per-worker still compare
+        if error_rate(run) > error_rate(base):
+            regressions.append(f"{label}: error rate {error_rate(base):.2%} -> {error_rate(run):.2%}{reason}")
+
+    for phase in ("idle", "loaded"):
+        base_mem = baseline.get("memory", {}).get(phase, {}).get("max_rss_mb")
+        mem = current.get("memory", {}).get(phase, {}).get("max_rss_mb")
+        if worse(base_mem, mem, True, threshold, 0.0):
+            regressions.append(f"memory ({phase}): max worker RSS {base_mem} MB -> {mem} MB")
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative change, 0.2 = 20%%")
+    parser.add_argument("--min-delta-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    regressions = compare(load(args.baseline), load(args.current), args.threshold, args.min_delta_ms)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    print(f"{len(regressions)} regression(s) against {args.baseline}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
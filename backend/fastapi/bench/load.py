@@ -0,0 +1,76 @@
+"""Closed-loop HTTP load generator shared by the benchmark scripts."""
+import asyncio
+import time
+
+import httpx
+import numpy as np
+
+
+# Prefix main.py puts on RAG replies when generation failed; those come back as HTTP 200
+RAG_ERROR_PREFIX = "❌"
+
+
+def check_rag_response(body: dict):
+    reply = body.get("response")
+    if isinstance(reply, dict):
+        # /rag nests the generate_rag_response dict one level down
+        reply = reply.get("response")
+    if not isinstance(reply, str) or not reply.strip():
+        return "missing response text"
+    if reply.startswith(RAG_ERROR_PREFIX):
+        return reply[:200]
+    return None
+
+
+def summarize(latencies: list, errors: int, elapsed: float, first_error=None) -> dict:
+    ms = np.asarray(latencies) * 1000
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "error_rate": round(errors / (len(latencies) + errors), 4) if latencies or errors else 0.0,
+        "first_error": first_error,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(float(np.percentile(ms, 50)), 2) if len(ms) else None,
+        "p95_ms": round(float(np.percentile(ms, 95)), 2) if len(ms) else None,
+        "p99_ms": round(float(np.percentile(ms, 99)), 2) if len(ms) else None,
+        "max_ms": round(float(ms.max()), 2) if len(ms) else None,
+    }
+
+
+async def run_load(base_url: str, path: str, make_body, concurrency: int, total: int, timeout=300.0,
+                   check=None) -> dict:
+    """Send ``total`` POSTs to ``path`` from ``concurrency`` workers.
+
+    ``make_body(i)`` returns the JSON body for request ``i``. ``check(body)``
+    inspects a 2xx JSON reply and returns an error message when the endpoint
+    reported a failure in-band, so it counts as an error rather than a success.
+    """
+    latencies = []
+    errors = 0
+    first_error = None
+    counter = iter(range(total))
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+        async def worker():
+            nonlocal errors, first_error
+            for i in counter:
+                start = time.perf_counter()
+                try:
+                    response = await client.post(path, json=make_body(i))
+                    response.raise_for_status()
+                    problem = check(response.json()) if check else None
+                except (httpx.HTTPError, ValueError) as e:
+                    problem = str(e) or type(e).__name__
+                if problem:
+                    errors += 1
+                    first_error = first_error or problem
+                    continue
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return summarize(latencies, errors, elapsed, first_error)
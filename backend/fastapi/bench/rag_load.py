@@ -0,0 +1,41 @@
+"""Throughput of /rag at increasing concurrency against the stub servers.
+
+Start bench/stub_servers.py and the API (pointed at the stubs, see the
+stub_servers docstring), then:
+
+    python bench/rag_load.py --url http://127.0.0.1:8000 --concurrency 1 4 16 32
+
+Every request asks a distinct question so the embedding cache never hits.
+"""
+import argparse
+import asyncio
+import json
+import uuid
+
+from load import check_rag_response, run_load
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--path", default="/rag")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 32])
+    parser.add_argument("--requests-per-worker", type=int, default=4)
+    args = parser.parse_args()
+
+    run_id = uuid.uuid4().hex[:8]
+    for concurrency in args.concurrency:
+        total = concurrency * args.requests_per_worker
+        result = asyncio.run(run_load(
+            args.url,
+            args.path,
+            lambda i: {"query": f"[{run_id}-{concurrency}-{i}] How is HbA1c used to adjust insulin?"},
+            concurrency,
+            total,
+            check=check_rag_response,
+        ))
+        print(json.dumps({"path": args.path, "concurrency": concurrency, **result}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Cold-start cost of the API: time to import main.py and to load each model.
+
+Each sample runs in a fresh interpreter so module caches don't carry over:
+
+    python bench/startup_time.py --runs 5
+
+Run it from backend/fastapi (model paths are relative to MODEL_DIR, default ".").
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Printed by the child as one JSON line; credentials are dummies since nothing is called
+PROBE = """
+import json, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter() - start
+loads = {}
+for name in main.models.info():
+    t = time.perf_counter()
+    main.models.get(name)
+    loads[name] = time.perf_counter() - t
+print(json.dumps({"import_s": imported, "model_load_s": loads}))
+"""
+
+
+def sample(env: dict) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE], env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault("OPENAI_API_KEY", "stub")
+    env.setdefault("GROQ_API_KEY", "stub")
+    env.setdefault("PINECONE_API_KEY", "stub")
+    env.setdefault("EMBEDDING_CACHE_PATH", "")
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [os.getcwd(), env.get("PYTHONPATH")]))
+
+    samples = [sample(env) for _ in range(args.runs)]
+    names = samples[0]["model_load_s"]
+    print(json.dumps({
+        "runs": args.runs,
+        "import_median_s": round(statistics.median(s["import_s"] for s in samples), 3),
+        "model_load_median_s": {
+            name: round(statistics.median(s["model_load_s"][name] for s in samples), 3) for name in names
+        },
+    }))
+
+
+if __name__ == "__main__":
+    main()
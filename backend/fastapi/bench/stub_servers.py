@@ -0,0 +1,123 @@
+"""Local stand-ins for the OpenAI embeddings, Pinecone query and Groq chat APIs.
+
+Each route sleeps for a configurable latency and returns a response shaped
+like the real API, so main.py can be load-tested without network access:
+
+    python bench/stub_servers.py --port 9100 --embed-ms 40 --query-ms 25 --llm-ms 600
+
+    OPENAI_BASE_URL=http://127.0.0.1:9100/v1 \\
+    GROQ_BASE_URL=http://127.0.0.1:9100 \\
+    PINECONE_INDEX_HOST=http://127.0.0.1:9100 \\
+    OPENAI_API_KEY=stub GROQ_API_KEY=stub PINECONE_API_KEY=stub \\
+    uvicorn main:app --port 8000
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import time
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+EMBEDDING_DIM = 1536
+
+latency = {"embed": 0.0, "query": 0.0, "llm": 0.0}
+app = FastAPI()
+
+# deepseek-r1 style reply: a reasoning block, then the visible answer
+REASONING = "<think>" + " ".join(["stub reasoning"] * 20) + "</think>\n"
+ANSWER = "Stub answer."
+
+
+def fake_embedding(text: str) -> list:
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:4], "little")
+    vector = np.random.default_rng(seed).standard_normal(EMBEDDING_DIM).astype(np.float32)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+@app.post("/v1/embeddings")
+async def embeddings(request: Request):
+    body = await request.json()
+    await asyncio.sleep(latency["embed"])
+    inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+    return {
+        "object": "list",
+        "model": body.get("model", "text-embedding-3-small"),
+        "data": [
+            {"object": "embedding", "index": i, "embedding": fake_embedding(text)}
+            for i, text in enumerate(inputs)
+        ],
+        "usage": {"prompt_tokens": 8, "total_tokens": 8},
+    }
+
+
+@app.post("/query")
+async def query(request: Request):
+    body = await request.json()
+    await asyncio.sleep(latency["query"])
+    return {
+        "namespace": "",
+        "matches": [
+            {"id": f"chunk-{i}", "score": 0.9 - i * 0.05, "metadata": {"text": f"Stub medical book passage {i}."}}
+            for i in range(body.get("topK", 3))
+        ],
+    }
+
+
+def completion_chunk(body: dict, delta: dict, finish_reason=None) -> str:
+    chunk = {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": body.get("model", "stub"),
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    return f"data: {json.dumps(chunk)}\n\n"
+
+
+async def stream_completion(body: dict):
+    # Whitespace-split tokens, paced so the whole reply takes the LLM latency
+    tokens = [token + " " for token in (REASONING + ANSWER).split(" ")]
+    yield completion_chunk(body, {"role": "assistant", "content": ""})
+    for token in tokens:
+        await asyncio.sleep(latency["llm"] / len(tokens))
+        yield completion_chunk(body, {"content": token})
+    yield completion_chunk(body, {}, finish_reason="stop")
+    yield "data: [DONE]\n\n"
+
+
+@app.post("/openai/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    if body.get("stream"):
+        return StreamingResponse(stream_completion(body), media_type="text/event-stream")
+
+    await asyncio.sleep(latency["llm"])
+    return {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "stub"),
+        "choices": [{
+            "index": 0,
+            "finish_reason": "stop",
+            "message": {"role": "assistant", "content": REASONING + ANSWER},
+        }],
+        "usage": {"prompt_tokens": 100, "completion_tokens": 10, "total_tokens": 110},
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--embed-ms", type=float, default=40)
+    parser.add_argument("--query-ms", type=float, default=25)
+    parser.add_argument("--llm-ms", type=float, default=600)
+    args = parser.parse_args()
+
+    latency.update(embed=args.embed_ms / 1000, query=args.query_ms / 1000, llm=args.llm_ms / 1000)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
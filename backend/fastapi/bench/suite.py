@@ -0,0 +1,294 @@
+"""Benchmark suite for the inference and RAG endpoints.
+
+Starts bench/stub_servers.py and the API under uvicorn, then drives each
+endpoint at every concurrency level and records latency percentiles,
+throughput and per-worker memory:
+
+    python bench/suite.py --workers 2 --concurrency 1 8 32 --llm-ms 600 \\
+        --output bench/results/latest.json --baseline bench/results/baseline.json
+
+Run it from backend/fastapi. With --baseline the run exits 1 on any
+regression reported by bench/compare.py. The workers, stubs and load
+generator share the host's CPUs, so only compare runs from the same machine
+and settings.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+import uuid
+
+import httpx
+
+from compare import compare, load
+from load import check_rag_response, run_load
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+PATIENT = {
+    "id": "bench-patient",
+    "age": 58,
+    "hba1c": 8.4,
+    "egfr": 72,
+    "insulin_regimen": "BB",
+}
+
+PATHLINE_PATIENT = {
+    "insulin_regimen": "BB",
+    "hba1c1": 9.1, "hba1c2": 8.4, "hba1c3": 7.8,
+    "hba1c_delta_1_2": 0.7,
+    "gap_initial_visit": 90, "gap_first_clinical": 60,
+    "egfr": 72, "reduction_percent": 14.3,
+    "fvg1": 11.2, "fvg2": 9.6, "fvg3": 8.1,
+    "fvg_delta_1_2": 1.6,
+    "dds1": 3.1, "dds3": 2.4, "dds_trend_1_3": -0.7,
+}
+
+
+def check_prediction(body: dict):
+    return None if isinstance(body.get("prediction"), float) else "missing prediction"
+
+
+def check_pathline(body: dict):
+    if len(body.get("probabilities") or []) != 3:
+        return "missing probabilities"
+    return check_rag_response({"response": body.get("insight")})
+
+
+# Endpoints whose failures come back as 200s need a body check to be counted
+CHECKS = {
+    "/predict": check_prediction,
+    "/predict-therapy-pathline": check_pathline,
+    "/rag": check_rag_response,
+    "/treatment-recommendation": check_rag_response,
+    "/chatbot-patient-query": check_rag_response,
+}
+
+
+def endpoint_bodies(run_id: str) -> dict:
+    # RAG questions are unique per request so the embedding and response caches miss
+    return {
+        "/predict": lambda i: {"features": [8.4, 7.9, 130, 145, 1.1, 0.02]},
+        "/predict-therapy-pathline": lambda i: PATHLINE_PATIENT,
+        "/rag": lambda i: {"query": f"[{run_id}-{i}] How is HbA1c used to adjust insulin?"},
+        "/treatment-recommendation": lambda i: {
+            "patient": PATIENT, "question": f"[{run_id}-{i}] Should the basal dose change?"
+        },
+        "/chatbot-patient-query": lambda i: {
+            "patient": PATIENT, "query": f"[{run_id}-{i}] Why is my fasting glucose high?"
+        },
+    }
+
+
+def children(pid: int) -> list:
+    found = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # Field 4 is the parent pid; split after the ")" closing the command name
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == pid:
+            found.append(int(entry))
+    return found
+
+
+def read_memory(pid: int) -> dict:
+    # RSS counts mmap'd model pages in every worker; PSS splits shared pages between them
+    memory = {"pid": pid}
+    for name, key in (("status", "VmRSS:"), ("smaps_rollup", "Pss:")):
+        try:
+            with open(f"/proc/{pid}/{name}") as f:
+                for line in f:
+                    if line.startswith(key):
+                        memory[f"{key[:-1].lower()}_mb"] = round(int(line.split()[1]) / 1024, 1)
+                        break
+        except OSError:
+            pass
+    return memory
+
+
+def worker_memory(server_pid: int) -> dict:
+    # uvicorn --workers N runs each worker as a spawned child; a single worker is the server itself
+    workers = []
+    for pid in children(server_pid):
+        try:
+            with open(f"/proc/{pid}/cmdline", "rb") as f:
+                if b"spawn_main" in f.read():
+                    workers.append(pid)
+        except OSError:
+            continue
+    workers = [read_memory(pid) for pid in (workers or [server_pid])]
+    rss = [w["vmrss_mb"] for w in workers if "vmrss_mb" in w]
+    return {
+        "workers": workers,
+        "max_rss_mb": max(rss) if rss else None,
+        "total_pss_mb": round(sum(w.get("pss_mb", 0) for w in workers), 1),
+    }
+
+
+def wait_ready(url: str, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"{url} not ready after {timeout}s")
+
+
+def ensure_port_free(port: int):
+    # A leftover server on the port would be benchmarked instead of the one started here
+    with socket.socket() as sock:
+        # Same option uvicorn sets, so sockets lingering in TIME_WAIT don't count as busy
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            sock.bind(("127.0.0.1", port))
+        except OSError:
+            raise RuntimeError(f"Port {port} is already in use; stop the old server or pick another port")
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def start_servers(args):
+    stub_url = f"http://127.0.0.1:{args.stub_port}"
+    stubs = subprocess.Popen([
+        sys.executable, os.path.join(BENCH_DIR, "stub_servers.py"),
+        "--port", str(args.stub_port),
+        "--embed-ms", str(args.embed_ms),
+        "--query-ms", str(args.query_ms),
+        "--llm-ms", str(args.llm_ms),
+    ])
+
+    env = dict(
+        os.environ,
+        OPENAI_BASE_URL=f"{stub_url}/v1",
+        GROQ_BASE_URL=stub_url,
+        PINECONE_INDEX_HOST=stub_url,
+        OPENAI_API_KEY="stub",
+        GROQ_API_KEY="stub",
+        PINECONE_API_KEY="stub",
+        # Memory-only caches so one run never warms the next
+        EMBEDDING_CACHE_PATH="",
+        # Load models at startup so memory readings don't depend on which worker served what
+        MODEL_PRELOAD="1",
+        LOG_LEVEL="WARNING",
+    )
+    server = subprocess.Popen([
+        sys.executable, "-m", "uvicorn", "main:app",
+        "--port", str(args.port),
+        "--workers", str(args.workers),
+        "--log-level", "warning",
+    ], env=env)
+    return stubs, server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--stub-port", type=int, default=9100)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests-per-worker", type=int, default=4)
+    parser.add_argument("--warmup", type=int, default=1, help="unmeasured requests per worker before each run")
+    parser.add_argument("--endpoints", nargs="+", help="subset of paths to run (default: all)")
+    parser.add_argument("--embed-ms", type=float, default=40)
+    parser.add_argument("--query-ms", type=float, default=25)
+    parser.add_argument("--llm-ms", type=float, default=600)
+    parser.add_argument("--output", default=os.path.join(BENCH_DIR, "results", "latest.json"))
+    parser.add_argument("--baseline", help="result file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    parser.add_argument("--min-delta-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    run_id = uuid.uuid4().hex[:8]
+    bodies = endpoint_bodies(run_id)
+    paths = args.endpoints or list(bodies)
+    base_url = f"http://127.0.0.1:{args.port}"
+
+    ensure_port_free(args.port)
+    ensure_port_free(args.stub_port)
+    stubs, server = start_servers(args)
+    try:
+        wait_ready(f"http://127.0.0.1:{args.stub_port}/docs", 30)
+        # /models is internal-only; the app only answers once its lifespan (and preload) is done
+        wait_ready(f"{base_url}/metrics", 120)
+        # Give the remaining workers time to finish preloading
+        time.sleep(2)
+        idle_memory = worker_memory(server.pid)
+
+        results = []
+        for path in paths:
+            for concurrency in args.concurrency:
+                # Unmeasured round first: lazy clients, thread pools and first-call paths in every worker
+                if args.warmup:
+                    asyncio.run(run_load(
+                        base_url,
+                        path,
+                        lambda i, path=path: bodies[path](f"warmup-{i}"),
+                        concurrency,
+                        concurrency * args.warmup,
+                    ))
+                summary = asyncio.run(run_load(
+                    base_url,
+                    path,
+                    lambda i, path=path, concurrency=concurrency: bodies[path](f"{concurrency}-{i}"),
+                    concurrency,
+                    concurrency * args.requests_per_worker,
+                    check=CHECKS.get(path),
+                ))
+                result = {"path": path, "concurrency": concurrency, **summary}
+                results.append(result)
+                print(json.dumps(result), flush=True)
+
+        loaded_memory = worker_memory(server.pid)
+    finally:
+        for process in (server, stubs):
+            process.terminate()
+            process.wait(timeout=30)
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "workers": args.workers,
+            "requests_per_worker": args.requests_per_worker,
+            "warmup": args.warmup,
+            "latency_ms": {"embed": args.embed_ms, "query": args.query_ms, "llm": args.llm_ms},
+        },
+        "results": results,
+        "memory": {"idle": idle_memory, "loaded": loaded_memory},
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output} (max worker RSS {loaded_memory['max_rss_mb']} MB)")
+
+    if args.baseline:
+        regressions = compare(load(args.baseline), report, args.threshold, args.min_delta_ms)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        print(f"{len(regressions)} regression(s) against {args.baseline}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+
+logger = logging.getLogger("fastapi_app.embedding_cache")
+
+# Puts between full row recounts of the shared SQLite file
+RECOUNT_EVERY = 1000
+
+
+def normalize_text(text: str) -> str:
+    # Case is kept: embeddings are case sensitive, whitespace is not
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def cache_key(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Content-addressed embedding cache.
+
+    A bounded in-process LRU sits in front of an optional SQLite file so
+    embeddings survive restarts and are shared by every worker on the host.
+    Vectors are stored as float32. ``ttl`` is in seconds; 0 disables expiry.
+    ``timeout`` is how long a write waits on another worker's lock on the
+    file before it is skipped.
+    """
+
+    def __init__(self, path=None, max_entries=2048, max_disk_entries=100_000, ttl=0, timeout=0.5):
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._memory = OrderedDict()
+        # _lock guards the LRU only, so memory hits never wait behind SQLite
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._db = None
+        self._disk_count = 0
+        self._writes = 0
+
+        if path:
+            self._db = sqlite3.connect(path, timeout=timeout, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, model TEXT NOT NULL, vector BLOB NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS embeddings_created_at ON embeddings (created_at)")
+            (self._disk_count,) = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+
+    def _expired(self, created_at: float) -> bool:
+        return bool(self.ttl) and time.time() - created_at > self.ttl
+
+    def _remember(self, key: str, vector: np.ndarray, created_at: float):
+        self._memory[key] = (vector, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def _memory_get(self, key: str):
+        entry = self._memory.get(key)
+        if entry is not None and not self._expired(entry[1]):
+            self._memory.move_to_end(key)
+            return entry[0]
+        if entry is not None:
+            del self._memory[key]
+        return None
+
+    def _disk_get(self, key: str):
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT vector, created_at FROM embeddings WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or self._expired(row[1]):
+            return None
+        return np.frombuffer(row[0], dtype=np.float32), row[1]
+
+    def _disk_put(self, key: str, model: str, vector: np.ndarray, created_at: float):
+        with self._db_lock:
+            params = (key, model, vector.tobytes(), created_at)
+            inserted = self._db.execute(
+                "INSERT OR IGNORE INTO embeddings (key, model, vector, created_at) VALUES (?, ?, ?, ?)", params
+            ).rowcount
+            if inserted:
+                self._disk_count += 1
+            else:
+                self._db.execute(
+                    "UPDATE embeddings SET model = ?, vector = ?, created_at = ? WHERE key = ?",
+                    params[1:] + (key,),
+                )
+            self._writes += 1
+            self._prune_disk()
+
+    async def get_or_compute(self, model: str, text: str, compute):
+        """Cached embedding for ``text``; ``compute(text)`` is awaited on a miss.
+
+        SQLite work runs in a thread so it never blocks the event loop, and a
+        failing disk (e.g. "database is locked") degrades to a miss or an
+        unsaved entry instead of failing the caller.
+        """
+        key = cache_key(model, text)
+        with self._lock:
+            vector = self._memory_get(key)
+            if vector is not None:
+                self.hits += 1
+                return vector.tolist()
+
+        row = None
+        if self._db is not None:
+            try:
+                row = await asyncio.to_thread(self._disk_get, key)
+            except sqlite3.Error as e:
+                logger.warning("Embedding cache read failed: %s", e)
+        with self._lock:
+            if row is not None:
+                self._remember(key, *row)
+                self.disk_hits += 1
+                return row[0].tolist()
+            self.misses += 1
+
+        embedding = await compute(text)
+        vector = np.asarray(embedding, dtype=np.float32)
+        created_at = time.time()
+        with self._lock:
+            self._remember(key, vector, created_at)
+        if self._db is not None:
+            try:
+                await asyncio.to_thread(self._disk_put, key, model, vector, created_at)
+            except sqlite3.Error as e:
+                logger.warning("Embedding cache write failed: %s", e)
+        return embedding
+
+    def _prune_disk(self):
+        if self.ttl:
+            self._disk_count -= self._db.execute(
+                "DELETE FROM embeddings WHERE created_at < ?", (time.time() - self.ttl,)
+            ).rowcount
+
+        # Other workers write to the same file, so the running count drifts low; recount now and then
+        if self._disk_count > self.max_disk_entries or self._writes % RECOUNT_EVERY == 0:
+            (self._disk_count,) = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+
+        excess = self._disk_count - self.max_disk_entries
+        if excess > 0:
+            deleted = self._db.execute(
+                "DELETE FROM embeddings WHERE key IN "
+                "(SELECT key FROM embeddings ORDER BY created_at LIMIT ?)",
+                (excess,),
+            ).rowcount
+            self._disk_count -= deleted
+            self.evictions += deleted
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute("DELETE FROM embeddings")
+                self._disk_count = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+        }
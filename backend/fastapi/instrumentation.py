@@ -0,0 +1,183 @@
+import contextlib
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+
+request_id_var = ContextVar("request_id", default="-")
+
+# Seconds; covers sub-millisecond model calls up to multi-second LLM calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def format_labels(names, values) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{str(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for label_values, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{format_labels(self.labels, label_values)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts, sum, count]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.setdefault(label_values, [[0] * len(self.buckets), 0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for label_values, (counts, total, count) in sorted(self._series.items()):
+            for bound, bucket_count in zip(self.buckets, counts):
+                labels = format_labels(self.labels + ("le",), label_values + (bound,))
+                lines.append(f"{self.name}_bucket{labels} {bucket_count}")
+            labels = format_labels(self.labels + ("le",), label_values + ("+Inf",))
+            lines.append(f"{self.name}_bucket{labels} {count}")
+            plain = format_labels(self.labels, label_values)
+            lines.append(f"{self.name}_sum{plain} {total}")
+            lines.append(f"{self.name}_count{plain} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        # Callables returning {metric name: (type, help, value)} at scrape time
+        self.collectors = []
+
+    def counter(self, *args, **kwargs) -> Counter:
+        metric = Counter(*args, **kwargs)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, *args, **kwargs) -> Histogram:
+        metric = Histogram(*args, **kwargs)
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for collect in self.collectors:
+            for name, (kind, help_text, value) in collect().items():
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.counter(
+    "http_requests_total", "HTTP requests handled.", ("method", "path", "status")
+)
+http_latency = registry.histogram(
+    "http_request_duration_seconds", "HTTP latency up to the response headers.", ("method", "path")
+)
+stage_latency = registry.histogram(
+    "stage_duration_seconds", "Latency of one pipeline stage.", ("stage",)
+)
+stage_errors = registry.counter(
+    "stage_errors_total", "Pipeline stage failures.", ("stage",)
+)
+
+
+@contextlib.contextmanager
+def span(stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        stage_errors.inc(stage)
+        raise
+    finally:
+        stage_latency.observe(time.perf_counter() - start, stage)
+
+
+async def instrument_requests(request, call_next):
+    """HTTP middleware: request id propagation plus per-route latency."""
+    request_id = request.headers.get("x-request-id") or uuid.uuid4().hex
+    token = request_id_var.set(request_id)
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        response.headers["X-Request-ID"] = request_id
+        return response
+    finally:
+        # Route templates keep label cardinality bounded (/cache/patients/{patient_id}/...)
+        route = request.scope.get("route")
+        path = getattr(route, "path", "unmatched")
+        elapsed = time.perf_counter() - start
+        http_requests.inc(request.method, path, status)
+        http_latency.observe(elapsed, request.method, path)
+        request_id_var.reset(token)
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class SampleFilter(logging.Filter):
+    # Passes roughly `rate` of records below WARNING; rate 0 drops all of them
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+
+def configure_logging():
+    handler = logging.StreamHandler()
+    handler.addFilter(RequestIdFilter())
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s"))
+
+    app_logger = logging.getLogger("fastapi_app")
+    app_logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    app_logger.propagate = False
+    if not app_logger.handlers:
+        app_logger.addHandler(handler)
+
+    # Per-request detail on the RAG and inference paths: DEBUG level, sampled, off by default
+    rate = float(os.getenv("HOT_PATH_LOG_SAMPLE_RATE", "0"))
+    hot_logger = logging.getLogger("fastapi_app.hotpath")
+    hot_logger.setLevel(logging.DEBUG if rate > 0 else logging.WARNING)
+    hot_logger.addFilter(SampleFilter(rate))
+
+    return app_logger, hot_logger
@@ -1,17 +1,46 @@
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
-import pandas as pd
+from starlette.concurrency import run_in_threadpool
 import numpy as np
-import joblib
-from sentence_transformers import SentenceTransformer
-from pinecone import Pinecone
-import openai
-from groq import Groq
+import asyncio
+import contextlib
+import functools
+import hmac
+import httpx
+import json
 import os
 
+from embedding_cache import EmbeddingCache
+from vector_store import LocalVectorIndex
+from streaming import SSE_HEADERS, ThinkFilter, sse_event
+from response_cache import ResponseCache
+from model_registry import IncompatibleModel, ModelRegistry
+from instrumentation import configure_logging, instrument_requests, registry, span
+
+logger, hot_logger = configure_logging()
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    # Runs once the module has loaded, so the models and HTTP client defined below exist
+    if os.getenv("MODEL_PRELOAD", "0") == "1":
+        for name in models.info():
+            await run_in_threadpool(models.get, name)
+    watcher = asyncio.create_task(watch_models()) if MODEL_CHECK_INTERVAL > 0 else None
+    try:
+        yield
+    finally:
+        if watcher is not None:
+            watcher.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await watcher
+        await http_client.aclose()
+
+
 # Initialize FastAPI
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+app.middleware("http")(instrument_requests)
 
 # CORS
 app.add_middleware(
@@ -22,49 +51,253 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Load models
-model = joblib.load("ridge_best_model_1.pkl")
-therapy_pathline_model = joblib.load("therapy_effectiveness_model.pkl")
+def rank_top_factors(pipeline, n=5):
+    feature_names = pipeline.named_steps['preprocessor'].get_feature_names_out()
+    importances = pipeline.named_steps['classifier'].feature_importances_
+    sorted_features = sorted(zip(feature_names, importances), key=lambda x: x[1], reverse=True)
+    return [{"feature": name, "importance": round(float(score), 4)} for name, score in sorted_features[:n]]
+
+
+# Models load on first use (MODEL_PRELOAD=1 loads them at startup instead).
+# MODEL_MMAP_MODE="r" memory-maps their arrays so workers share one copy; "" disables it.
+# Reloads are published to MODEL_MANIFEST and every worker polls it each MODEL_CHECK_INTERVAL seconds.
+MODEL_DIR = os.getenv("MODEL_DIR", ".")
+MODEL_CHECK_INTERVAL = float(os.getenv("MODEL_CHECK_INTERVAL", "5"))
+models = ModelRegistry(
+    mmap_mode=os.getenv("MODEL_MMAP_MODE", "r") or None,
+    manifest=os.getenv("MODEL_MANIFEST", os.path.join(MODEL_DIR, "models.json")),
+)
+models.register("risk", os.path.join(MODEL_DIR, "ridge_best_model_1.pkl"))
+# Importances are fixed per fitted model, so they are ranked once per load
+models.register("therapy_pathline", os.path.join(MODEL_DIR, "therapy_effectiveness_model.pkl"),
+                prepare=rank_top_factors)
+
+
+async def watch_models():
+    while True:
+        await asyncio.sleep(MODEL_CHECK_INTERVAL)
+        try:
+            await run_in_threadpool(models.refresh)
+        except Exception as e:
+            logger.warning("Model refresh failed: %s", e)
+
+
+# Cache invalidation and model listing/reloads are for Laravel and operators only. With
+# INTERNAL_API_TOKEN set, callers must send it as X-Internal-Token; without it,
+# only loopback clients are accepted.
+INTERNAL_API_TOKEN = os.getenv("INTERNAL_API_TOKEN", "")
+LOOPBACK_HOSTS = {"127.0.0.1", "::1"}
+
+
+def require_internal(request: Request, x_internal_token: str | None = Header(None)):
+    if INTERNAL_API_TOKEN:
+        if not x_internal_token or not hmac.compare_digest(x_internal_token, INTERNAL_API_TOKEN):
+            raise HTTPException(status_code=403, detail="Internal endpoint.")
+    elif request.client is None or request.client.host not in LOOPBACK_HOSTS:
+        raise HTTPException(status_code=403, detail="Internal endpoint.")
 
 # RAG setup
-pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
-openai.api_key = os.getenv("OPENAI_API_KEY")
+PINECONE_INDEX = "medicalbooks-1536"
+PINECONE_API_VERSION = "2025-01"
+
+# One pooled HTTP client shared by the embedding, vector and LLM calls
+http_client = httpx.AsyncClient(
+    limits=httpx.Limits(
+        max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "100")),
+        max_keepalive_connections=int(os.getenv("HTTP_MAX_KEEPALIVE", "20")),
+    ),
+    timeout=httpx.Timeout(120.0, connect=5.0),
+)
 
-index = pc.Index("medicalbooks-1536")
 
-def get_openai_embedding(text: str) -> list:
+# The SDKs are slow to import, so the clients are built on first call
+@functools.cache
+def get_openai_client():
+    from openai import AsyncOpenAI
+    return AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), http_client=http_client)
+
+
+@functools.cache
+def get_groq_client():
+    from groq import AsyncGroq
+    return AsyncGroq(api_key=os.getenv("GROQ_API_KEY"), http_client=http_client)
+
+
+class Stage:
+    # Bounds how many calls of one pipeline stage run at once and how long each may take
+    def __init__(self, name, timeout, concurrency):
+        self.name = name
+        self.timeout = timeout
+        self.semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(self, coro):
+        async with self.semaphore:
+            try:
+                with span(self.name):
+                    return await asyncio.wait_for(coro, self.timeout)
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"{self.name} timed out after {self.timeout}s")
+
+    async def stream(self, create):
+        """Items of a streamed call; ``create`` is the awaitable that opens the stream.
+
+        The timeout covers the whole stream but is only enforced around the
+        upstream reads, and the semaphore is held per read, so nothing here is
+        held or cancelled while the consumer works on a yielded item.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+
+        async def bounded(awaitable):
+            async with self.semaphore:
+                try:
+                    return await asyncio.wait_for(awaitable, max(deadline - loop.time(), 0))
+                except asyncio.TimeoutError:
+                    raise TimeoutError(f"{self.name} timed out after {self.timeout}s")
+
+        with span(self.name):
+            chunks = aiter(await bounded(create))
+            while True:
+                try:
+                    chunk = await bounded(anext(chunks))
+                except StopAsyncIteration:
+                    return
+                yield chunk
+
+
+embed_stage = Stage(
+    "embedding",
+    float(os.getenv("RAG_EMBED_TIMEOUT", "10")),
+    int(os.getenv("RAG_EMBED_CONCURRENCY", "32")),
+)
+retrieve_stage = Stage(
+    "vector_query",
+    float(os.getenv("RAG_RETRIEVE_TIMEOUT", "5")),
+    int(os.getenv("RAG_RETRIEVE_CONCURRENCY", "32")),
+)
+llm_stage = Stage(
+    "llm_call",
+    float(os.getenv("RAG_LLM_TIMEOUT", "120")),
+    int(os.getenv("RAG_LLM_CONCURRENCY", "16")),
+)
+
+pinecone_host = os.getenv("PINECONE_INDEX_HOST")
+
+# Retriever backend: "pinecone" (default) or "local" (snapshot from vector_snapshot.py)
+RETRIEVER_BACKEND = os.getenv("RETRIEVER_BACKEND", "pinecone")
+local_index = None
+if RETRIEVER_BACKEND == "local":
+    local_index = LocalVectorIndex.load(
+        os.getenv("LOCAL_INDEX_DIR", "vector_index"),
+        nprobe=int(os.getenv("LOCAL_INDEX_NPROBE", "8")),
+    )
+
+
+async def get_pinecone_host() -> str:
+    global pinecone_host
+    if not pinecone_host:
+        from pinecone import Pinecone
+        pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+        description = await asyncio.to_thread(pc.describe_index, PINECONE_INDEX)
+        pinecone_host = description.host
+    if not pinecone_host.startswith("http"):
+        pinecone_host = f"https://{pinecone_host}"
+    return pinecone_host
+
+
+# Embedding cache (set EMBEDDING_CACHE_PATH="" to keep it in memory only)
+EMBEDDING_MODEL = "text-embedding-3-small"
+embedding_cache = EmbeddingCache(
+    path=os.getenv("EMBEDDING_CACHE_PATH", "embedding_cache.sqlite3"),
+    max_entries=int(os.getenv("EMBEDDING_CACHE_SIZE", "2048")),
+    max_disk_entries=int(os.getenv("EMBEDDING_CACHE_DISK_SIZE", "100000")),
+    ttl=float(os.getenv("EMBEDDING_CACHE_TTL", "0")),
+)
+
+# Generated-response cache (RESPONSE_CACHE_SEMANTIC_THRESHOLD=0 keeps it exact-match only)
+response_cache = ResponseCache(
+    max_entries=int(os.getenv("RESPONSE_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("RESPONSE_CACHE_TTL", "3600")),
+    semantic_threshold=float(os.getenv("RESPONSE_CACHE_SEMANTIC_THRESHOLD", "0")),
+)
+
+def cache_metrics():
+    return {
+        "embedding_cache_hits_total": ("counter", "Embedding lookups served from memory or disk.",
+                                       embedding_cache.hits + embedding_cache.disk_hits),
+        "embedding_cache_misses_total": ("counter", "Embedding lookups that called OpenAI.", embedding_cache.misses),
+        "response_cache_exact_hits_total": ("counter", "RAG responses served by exact match.", response_cache.exact_hits),
+        "response_cache_semantic_hits_total": ("counter", "RAG responses served by semantic match.",
+                                               response_cache.semantic_hits),
+        "response_cache_misses_total": ("counter", "RAG responses that called the LLM.", response_cache.misses),
+        "response_cache_entries": ("gauge", "RAG responses currently cached.", len(response_cache)),
+    }
+
+
+registry.collectors.append(cache_metrics)
+
+async def fetch_openai_embedding(text: str) -> list:
     try:
-        print("🔍 Getting OpenAI embedding...")
-        response = openai.embeddings.create(
-            model="text-embedding-3-small",
+        hot_logger.debug("Getting OpenAI embedding (%d chars)", len(text))
+        response = await get_openai_client().embeddings.create(
+            model=EMBEDDING_MODEL,
             input=[text]
         )
-        print("✅ Embedding received.")
         return response.data[0].embedding
     except Exception as e:
-        print("❌ OpenAI Embedding Error:", e)
+        logger.error("OpenAI embedding error: %s", e)
         raise
 
 
-def retrieve_context(query, top_k=3):
-    query_vec = get_openai_embedding(query)
-    results = index.query(vector=query_vec, top_k=top_k, include_metadata=True)
+async def get_openai_embedding(text: str) -> list:
+    return await embedding_cache.get_or_compute(
+        EMBEDDING_MODEL, text, lambda t: embed_stage.run(fetch_openai_embedding(t))
+    )
 
-    context_chunks = []
-    for match in results.get("matches", []):
-        metadata = match.get("metadata", {})
-        if "text" in metadata:
-            context_chunks.append(metadata["text"])
-    
-    return context_chunks
 
+async def query_index(vector: list, top_k: int) -> dict:
+    if local_index is not None:
+        # Exact search over the corpus is CPU-bound; keep it off the event loop
+        return await asyncio.to_thread(local_index.query, vector, top_k)
+    return await query_pinecone(vector, top_k)
+
+
+async def query_pinecone(vector: list, top_k: int) -> dict:
+    # Pinecone data-plane REST call, so the query shares the pooled async client
+    response = await http_client.post(
+        f"{await get_pinecone_host()}/query",
+        json={"vector": vector, "topK": top_k, "includeMetadata": True},
+        headers={
+            "Api-Key": os.getenv("PINECONE_API_KEY", ""),
+            "X-Pinecone-API-Version": PINECONE_API_VERSION,
+        },
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+async def retrieve_matches(query, top_k=3):
+    query_vec = await get_openai_embedding(query)
+    results = await retrieve_stage.run(query_index(query_vec, top_k))
+    matches = [m for m in results.get("matches", []) if "text" in m.get("metadata", {})]
+    return query_vec, matches
 
-def generate_rag_response(user_query, patient_context=""):
-    try:
-        context_chunks = retrieve_context(user_query)
-        print("[RAG] Retrieved context:", context_chunks)
 
+async def retrieve_context(query, top_k=3):
+    _, matches = await retrieve_matches(query, top_k)
+    return [match["metadata"]["text"] for match in matches]
+
+
+LLM_MODEL = "deepseek-r1-distill-llama-70b"
+LLM_TEMPERATURE = 0.7
+
+
+async def build_rag_prompt(user_query, patient_context=""):
+    query_vec, matches = await retrieve_matches(user_query)
+    context_chunks = [match["metadata"]["text"] for match in matches]
+    hot_logger.debug("Retrieved chunks: %s", [match.get("id") for match in matches])
+
+    with span("prompt_build"):
         all_context = f"Patient Info:\n{patient_context}\n\nMedical Book Context:\n" + "\n".join(context_chunks)
 
         prompt = f"""
@@ -82,28 +315,118 @@ Instructions:
 - Mention insulin regimen (e.g. PBD) only if clearly stated in the context.
 """.strip()
 
-        response = groq_client.chat.completions.create(
-            model="deepseek-r1-distill-llama-70b",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.7
+    return {
+        "prompt": prompt,
+        "context_used": all_context,
+        "query_vec": query_vec,
+        "chunk_ids": [match.get("id") for match in matches],
+    }
+
+
+async def response_cache_lookup(user_query, patient_context, patient_id, semantic, rag, semantic_text=None):
+    # Semantic matches stay within one patient's scope; pass semantic=False when
+    # the patient is only identified by text inside user_query. When user_query is
+    # a whole templated prompt, semantic_text is the bare question to compare on,
+    # otherwise the shared template makes every question look alike.
+    key = ResponseCache.key(user_query, patient_context, rag["chunk_ids"], LLM_MODEL, LLM_TEMPERATURE)
+    scope = ResponseCache.scope(patient_context, patient_id, LLM_MODEL, LLM_TEMPERATURE)
+    embedding = None
+    if semantic and response_cache.semantic_threshold:
+        embedding = await get_openai_embedding(semantic_text) if semantic_text else rag["query_vec"]
+    cached = response_cache.lookup(key, scope, embedding)
+
+    def store(result):
+        response_cache.put(key, result, scope, embedding, patient_id)
+
+    return cached, store
+
+
+async def generate_rag_response(user_query, patient_context="", patient_id=None, semantic=True, semantic_text=None):
+    try:
+        rag = await build_rag_prompt(user_query, patient_context)
+        cached, store = await response_cache_lookup(
+            user_query, patient_context, patient_id, semantic, rag, semantic_text
         )
+        if cached is not None:
+            return cached
 
-        return {
+        response = await llm_stage.run(get_groq_client().chat.completions.create(
+            model=LLM_MODEL,
+            messages=[{"role": "user", "content": rag["prompt"]}],
+            temperature=LLM_TEMPERATURE
+        ))
+
+        result = {
             "response": response.choices[0].message.content,
-            "context_used": all_context
+            "context_used": rag["context_used"]
         }
+        store(result)
+        return result
 
     except Exception as e:
-        print("[RAG ERROR]", str(e))
+        logger.error("RAG error: %s", e)
         return {
             "response": "❌ AI backend error: " + str(e),
             "context_used": ""
         }
 
+
+async def stream_llm_tokens(messages, **kwargs):
+    # Yields visible reply text as it arrives, with <think> spans removed
+    think_filter = ThinkFilter()
+    stream = llm_stage.stream(get_groq_client().chat.completions.create(
+        model=LLM_MODEL,
+        messages=messages,
+        stream=True,
+        **kwargs
+    ))
+    async for chunk in stream:
+        if not chunk.choices:
+            continue
+        text = think_filter.feed(chunk.choices[0].delta.content or "")
+        if text:
+            yield text
+
+    text = think_filter.flush()
+    if text:
+        yield text
+
+
+async def stream_rag_events(user_query, patient_context="", patient_id=None, semantic=True, semantic_text=None):
+    try:
+        rag = await build_rag_prompt(user_query, patient_context)
+        cached, store = await response_cache_lookup(
+            user_query, patient_context, patient_id, semantic, rag, semantic_text
+        )
+
+        if cached is not None:
+            think_filter = ThinkFilter()
+            text = think_filter.feed(cached["response"]) + think_filter.flush()
+            yield sse_event({"token": text})
+            yield sse_event({"context_used": cached["context_used"]}, event="done")
+            return
+
+        visible = []
+        async for text in stream_llm_tokens([{"role": "user", "content": rag["prompt"]}], temperature=LLM_TEMPERATURE):
+            visible.append(text)
+            yield sse_event({"token": text})
+
+        store({"response": "".join(visible), "context_used": rag["context_used"]})
+        yield sse_event({"context_used": rag["context_used"]}, event="done")
+
+    except Exception as e:
+        logger.error("RAG stream error: %s", e)
+        yield sse_event({"error": "❌ AI backend error: " + str(e)}, event="error")
+
 # Data models
 class PredictionRequest(BaseModel):
     features: list[float]
 
+class BatchPredictionRequest(BaseModel):
+    # Either row-major feature vectors or one list per feature (columnar)
+    rows: list[list[float]] | None = None
+    columns: list[list[float]] | None = None
+
 class TreatmentRequest(BaseModel):
     patient: dict
     question: str
@@ -130,19 +453,211 @@ class PatientData(BaseModel):
     dds3: float
     dds_trend_1_3: float
 
+class PathlineBatchRequest(BaseModel):
+    patients: list[PatientData]
+
+# PatientData field -> therapy model column, in the order the model was fitted on
+PATHLINE_COLUMNS = {
+    'insulin_regimen': 'INSULIN REGIMEN',
+    'hba1c1': 'HbA1c1',
+    'hba1c2': 'HbA1c2',
+    'hba1c3': 'HbA1c3',
+    'hba1c_delta_1_2': 'HbA1c_Delta_1_2',
+    'gap_initial_visit': 'Gap from initial visit (days)',
+    'gap_first_clinical': 'Gap from first clinical visit (days)',
+    'egfr': 'eGFR',
+    'reduction_percent': 'Reduction (%)',
+    'fvg1': 'FVG1',
+    'fvg2': 'FVG2',
+    'fvg3': 'FVG3',
+    'fvg_delta_1_2': 'FVG_Delta_1_2',
+    'dds1': 'DDS1',
+    'dds3': 'DDS3',
+    'dds_trend_1_3': 'DDS_Trend_1_3',
+}
+PATHLINE_VISITS = ['HbA1c1', 'HbA1c2', 'HbA1c3']
+
 # Routes
 @app.post("/predict")
 def predict(req: PredictionRequest):
     input_data = np.array(req.features).reshape(1, -1)
-    prediction = model.predict(input_data)
+    with span("model_inference"):
+        prediction = models.get("risk").predict(input_data)
     return {"prediction": float(prediction[0])}
 
+
+# Rows scored per model.predict call when streaming NDJSON
+PREDICT_STREAM_CHUNK = int(os.getenv("PREDICT_STREAM_CHUNK", "1024"))
+BUFFER_DTYPES = {"float32": "<f4", "float64": "<f8"}
+
+
+def check_feature_matrix(features, n_features=None) -> np.ndarray:
+    try:
+        X = np.asarray(features, dtype=np.float64)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=422, detail="All feature rows must have the same length.")
+
+    if X.ndim != 2 or X.shape[0] == 0:
+        raise HTTPException(status_code=422, detail="Expected a non-empty 2-D array of feature rows.")
+    if n_features is not None and X.shape[1] != n_features:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Expected {n_features} features per row, got {X.shape[1]}."
+        )
+    if not np.isfinite(X).all():
+        raise HTTPException(status_code=422, detail="Features must be finite numbers.")
+
+    return X
+
+
+def predict_matrix(X: np.ndarray) -> list:
+    with span("model_inference"):
+        return models.get("risk").predict(X).astype(float).tolist()
+
+
+async def read_ndjson_matrix(request: Request, n_features=None) -> np.ndarray:
+    # Parse the body as it arrives so only the compact float array is kept
+    buffer = b""
+    rows = []
+    blocks = []
+
+    try:
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            rows.extend(json.loads(line) for line in lines if line.strip())
+            if len(rows) >= PREDICT_STREAM_CHUNK:
+                blocks.append(check_feature_matrix(rows, n_features))
+                rows = []
+
+        if buffer.strip():
+            rows.append(json.loads(buffer))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid NDJSON row: {e}")
+
+    if rows:
+        blocks.append(check_feature_matrix(rows, n_features))
+    if not blocks:
+        raise HTTPException(status_code=422, detail="Expected at least one feature row.")
+
+    return np.concatenate(blocks)
+
+
+def parse_json_batch(body: bytes, n_features=None) -> np.ndarray:
+    try:
+        req = BatchPredictionRequest.model_validate_json(body)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if (req.rows is None) == (req.columns is None):
+        raise HTTPException(status_code=422, detail="Send exactly one of 'rows' or 'columns'.")
+    if req.columns is not None and len({len(col) for col in req.columns}) > 1:
+        raise HTTPException(status_code=422, detail="All columns must have the same length.")
+    return check_feature_matrix(req.rows if req.rows is not None else np.asarray(req.columns).T, n_features)
+
+
+def stream_ndjson_predictions(X: np.ndarray):
+    for start in range(0, len(X), PREDICT_STREAM_CHUNK):
+        predictions = predict_matrix(X[start:start + PREDICT_STREAM_CHUNK])
+        yield "".join(json.dumps({"prediction": p}) + "\n" for p in predictions)
+
+
+@app.post("/predict/batch")
+async def predict_batch(request: Request, n_features: int | None = Query(None, ge=1), dtype: str = "float64"):
+    content_type = request.headers.get("content-type", "application/json").split(";")[0].strip()
+    # The first request in a worker may load the model (and sklearn); keep that off the event loop
+    model_width = getattr(await run_in_threadpool(models.get, "risk"), "n_features_in_", None)
+    # n_features is the buffer row width, and for JSON/NDJSON an assertion on the parsed rows
+    if n_features and model_width and n_features != model_width:
+        raise HTTPException(
+            status_code=422,
+            detail=f"n_features={n_features}, but the model takes {model_width} features per row."
+        )
+    expected = model_width or n_features
+
+    # One JSON feature array per line in, one {"prediction": ...} per line out
+    if content_type == "application/x-ndjson":
+        X = await read_ndjson_matrix(request, expected)
+        return StreamingResponse(stream_ndjson_predictions(X), media_type="application/x-ndjson")
+
+    # Raw little-endian buffer, e.g. np.ndarray.astype("<f8").tobytes()
+    if content_type == "application/octet-stream":
+        if dtype not in BUFFER_DTYPES:
+            raise HTTPException(status_code=422, detail=f"dtype must be one of {sorted(BUFFER_DTYPES)}.")
+        width = expected
+        if not width:
+            raise HTTPException(status_code=422, detail="n_features is required for buffer input.")
+
+        body = await request.body()
+        itemsize = np.dtype(BUFFER_DTYPES[dtype]).itemsize
+        if len(body) % (itemsize * width):
+            raise HTTPException(status_code=422, detail="Buffer size is not a multiple of the row size.")
+
+        X = check_feature_matrix(np.frombuffer(body, dtype=BUFFER_DTYPES[dtype]).reshape(-1, width), expected)
+    else:
+        # Decoding and validating a large body takes long enough to stall other requests
+        X = await run_in_threadpool(parse_json_batch, await request.body(), expected)
+
+    predictions = await run_in_threadpool(predict_matrix, X)
+    return {"predictions": predictions}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/embedding-cache/stats")
+def embedding_cache_stats():
+    return embedding_cache.stats()
+
+@app.get("/response-cache/stats")
+def response_cache_stats():
+    return response_cache.stats()
+
+@app.post("/cache/patients/{patient_id}/invalidate", dependencies=[Depends(require_internal)])
+def invalidate_patient_cache(patient_id: str):
+    return {"invalidated": response_cache.invalidate_patient(patient_id)}
+
+@app.get("/models", dependencies=[Depends(require_internal)])
+def list_models():
+    return models.info()
+
+class ModelReloadRequest(BaseModel):
+    # New pickle to serve, relative to MODEL_DIR; omit to re-read the current file
+    file: str | None = None
+
+@app.post("/models/{name}/reload", dependencies=[Depends(require_internal)])
+async def reload_model(name: str, req: ModelReloadRequest | None = None):
+    if name not in models.info():
+        raise HTTPException(status_code=404, detail=f"Unknown model '{name}'")
+
+    path = None
+    if req is not None and req.file:
+        if os.path.basename(req.file) != req.file:
+            raise HTTPException(status_code=400, detail="file must be a name inside MODEL_DIR")
+        path = os.path.join(MODEL_DIR, req.file)
+        if not os.path.isfile(path):
+            raise HTTPException(status_code=404, detail=f"{req.file} not found")
+
+    try:
+        info = await run_in_threadpool(models.reload, name, path)
+    except IncompatibleModel as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        logger.error("Model reload failed for %s: %s", name, e)
+        raise HTTPException(status_code=500, detail=f"Reload failed: {e}")
+    logger.info("Reloaded model %s from %s", name, info["path"])
+    return info
+
 @app.post("/rag")
 async def rag_query(request: Request):
     query = (await request.json())["query"]
-    response_text = generate_rag_response(query)
+    response_text = await generate_rag_response(query)
     return {"response": response_text}
 
+@app.post("/rag/stream")
+async def rag_query_stream(request: Request):
+    query = (await request.json())["query"]
+    return StreamingResponse(stream_rag_events(query), media_type="text/event-stream", headers=SSE_HEADERS)
+
 @app.post("/treatment-recommendation")
 async def treatment_recommendation(request: Request):
     try:
@@ -154,7 +669,7 @@ async def treatment_recommendation(request: Request):
         patient_data = "\n".join([f"{k}: {v}" for k, v in patient.items()])
 
         # Use RAG-style structured prompt (pass patient context)
-        response = generate_rag_response(question, patient_context=patient_data)
+        response = await generate_rag_response(question, patient_context=patient_data, patient_id=patient.get("id"))
 
         return {
             "response": response["response"],
@@ -162,14 +677,13 @@ async def treatment_recommendation(request: Request):
         }
 
     except Exception as e:
-        print("❌ Treatment Recommendation Error:", e)
+        logger.error("Treatment recommendation error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/chatbot-patient-query")
-async def chatbot_patient_query(req: PatientChatRequest):
+def build_patient_chat_prompt(req: PatientChatRequest) -> str:
     patient_data = "\n".join([f"{k}: {v}" for k, v in req.patient.items()])
-    prompt = f"""
+    return f"""
 You are a clinical health assistant.
 
 Context:
@@ -191,77 +705,157 @@ Instructions:
 - Keep responses friendly and clear, under 180 words.
 """
 
-    response = generate_rag_response(prompt)
+
+@app.post("/chatbot-patient-query")
+async def chatbot_patient_query(req: PatientChatRequest):
+    response = await generate_rag_response(
+        build_patient_chat_prompt(req),
+        patient_id=req.patient.get("id"),
+        semantic="id" in req.patient,
+        semantic_text=req.query
+    )
     return {"response": response["response"]}
 
 
-@app.post("/predict-therapy-pathline")
-def predict_therapy_pathline(data: PatientData):
+@app.post("/chatbot-patient-query/stream")
+async def chatbot_patient_query_stream(req: PatientChatRequest):
+    return StreamingResponse(
+        stream_rag_events(
+            build_patient_chat_prompt(req),
+            patient_id=req.patient.get("id"),
+            semantic="id" in req.patient,
+            semantic_text=req.query
+        ),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+
+def build_pathline_frame(patients: list[PatientData]) -> "pd.DataFrame":
+    # One row per (patient, visit): HbA1c1 takes each visit's HbA1c in turn
+    import pandas as pd
+
+    with span("dataframe_construction"):
+        df = pd.DataFrame([p.model_dump() for p in patients]).rename(columns=PATHLINE_COLUMNS)
+        df = df[list(PATHLINE_COLUMNS.values())]
+
+        frame = df.loc[df.index.repeat(len(PATHLINE_VISITS))].reset_index(drop=True)
+        frame['HbA1c1'] = df[PATHLINE_VISITS].to_numpy().ravel()
+        return frame
+
+
+def known_regimens(pipeline):
+    # Categories the regimen encoder was fitted on; None when it tolerates unknown values
+    for _, encoder, columns in pipeline.named_steps['preprocessor'].transformers_:
+        columns = list(columns) if not isinstance(columns, str) else [columns]
+        if 'INSULIN REGIMEN' in columns and hasattr(encoder, "categories_"):
+            if getattr(encoder, "handle_unknown", "error") != "error":
+                return None
+            return set(encoder.categories_[columns.index('INSULIN REGIMEN')])
+    return None
+
+
+def check_regimens(patients: list[PatientData]):
+    # The encoder would reject the whole batch with a 500; name the offending patients instead
+    regimens = known_regimens(models.get("therapy_pathline"))
+    if regimens is None:
+        return
+    unknown = [i for i, p in enumerate(patients) if p.insulin_regimen not in regimens]
+    if unknown:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Unknown insulin_regimen for patient index {unknown}; expected one of {sorted(regimens)}."
+        )
+
+
+def score_pathlines(patients: list[PatientData]) -> list[list[float]]:
+    frame = build_pathline_frame(patients)
+    with span("model_inference"):
+        probs = models.get("therapy_pathline").predict_proba(frame)[:, 1]
+    return np.round(probs, 3).reshape(len(patients), len(PATHLINE_VISITS)).tolist()
+
+
+@app.post("/predict-therapy-pathline/batch")
+def predict_therapy_pathline_batch(req: PathlineBatchRequest):
+    if not req.patients:
+        raise HTTPException(status_code=422, detail="Expected at least one patient.")
+    check_regimens(req.patients)
+
     try:
-        patient_dict = {
-            'INSULIN REGIMEN': [data.insulin_regimen],
-            'HbA1c1': [data.hba1c1],
-            'HbA1c2': [data.hba1c2],
-            'HbA1c3': [data.hba1c3],
-            'HbA1c_Delta_1_2': [data.hba1c_delta_1_2],
-            'Gap from initial visit (days)': [data.gap_initial_visit],
-            'Gap from first clinical visit (days)': [data.gap_first_clinical],
-            'eGFR': [data.egfr],
-            'Reduction (%)': [data.reduction_percent],
-            'FVG1': [data.fvg1],
-            'FVG2': [data.fvg2],
-            'FVG3': [data.fvg3],
-            'FVG_Delta_1_2': [data.fvg_delta_1_2],
-            'DDS1': [data.dds1],
-            'DDS3': [data.dds3],
-            'DDS_Trend_1_3': [data.dds_trend_1_3],
-        }
+        probabilities = score_pathlines(req.patients)
+    except Exception as e:
+        logger.error("Pathline batch error: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
 
-        df = pd.DataFrame(patient_dict)
-        visits = [data.hba1c1, data.hba1c2, data.hba1c3]
-        probabilities = []
-
-        for val in visits:
-            df['HbA1c1'] = [val]
-            prob = therapy_pathline_model.predict_proba(df)[0][1]
-            probabilities.append(round(prob, 3))
-
-        prob_text = "\n".join([f"Visit {i+1}: {p * 100:.1f}%" for i, p in enumerate(probabilities)])
-        prompt = (
-            f"The patient is undergoing the insulin regimen: {data.insulin_regimen}.\n"
-            "The predicted therapy effectiveness probabilities over three visits are:\n{prob_text}\n\n"
-            "Format insights using short bullet points and clear icons. Use **bold** for trend headers like HbA1c, FVG, DDS. Each bullet must not exceed 20 words. Structure like:\n"
-            "- 🔹 **HbA1c**: Short statement.\n- 🧪 **FVG**: Short statement.\n- 💬 **DDS**: Short statement.\n"
-            "Then give 2 next steps as ✅ bullets.\nKeep output brief and scannable."
-            "Additionally, justify the therapy effectiveness probabilities by analyzing the patient's HbA1c, FVG, and DDS score trends.\n"
-            f"- HbA1c scores: {data.hba1c1}, {data.hba1c2}, {data.hba1c3}\n"
-            f"- FVG scores: {data.fvg1}, {data.fvg2}, {data.fvg3}\n"
-            f"- DDS scores: {data.dds1}, {data.dds3}\n"
-            "Please keep your response concise and limit it to no more than 360 words."
-        )
+    return {
+        "results": [{"probabilities": p} for p in probabilities],
+        "top_factors": models.prepared("therapy_pathline")
+    }
+
+
+def build_pathline_messages(data: PatientData, probabilities: list) -> list:
+    prob_text = "\n".join([f"Visit {i+1}: {p * 100:.1f}%" for i, p in enumerate(probabilities)])
+    prompt = (
+        f"The patient is undergoing the insulin regimen: {data.insulin_regimen}.\n"
+        "The predicted therapy effectiveness probabilities over three visits are:\n{prob_text}\n\n"
+        "Format insights using short bullet points and clear icons. Use **bold** for trend headers like HbA1c, FVG, DDS. Each bullet must not exceed 20 words. Structure like:\n"
+        "- 🔹 **HbA1c**: Short statement.\n- 🧪 **FVG**: Short statement.\n- 💬 **DDS**: Short statement.\n"
+        "Then give 2 next steps as ✅ bullets.\nKeep output brief and scannable."
+        "Additionally, justify the therapy effectiveness probabilities by analyzing the patient's HbA1c, FVG, and DDS score trends.\n"
+        f"- HbA1c scores: {data.hba1c1}, {data.hba1c2}, {data.hba1c3}\n"
+        f"- FVG scores: {data.fvg1}, {data.fvg2}, {data.fvg3}\n"
+        f"- DDS scores: {data.dds1}, {data.dds3}\n"
+        "Please keep your response concise and limit it to no more than 360 words."
+    )
+
+    return [
+        {"role": "system", "content": "You are a helpful medical AI assistant."},
+        {"role": "user", "content": prompt}
+    ]
 
-        llm = groq_client.chat.completions.create(
-            model="deepseek-r1-distill-llama-70b",
-            messages=[
-                {"role": "system", "content": "You are a helpful medical AI assistant."},
-                {"role": "user", "content": prompt}
-            ]
-        )
 
-        full_reply = llm.choices[0].message.content
-        insight = full_reply.split("</think>")[-1].strip() if "</think>" in full_reply else full_reply.strip()
+@app.post("/predict-therapy-pathline")
+async def predict_therapy_pathline(data: PatientData):
+    await run_in_threadpool(check_regimens, [data])
+    try:
+        probabilities = (await run_in_threadpool(score_pathlines, [data]))[0]
 
-        feature_names = therapy_pathline_model.named_steps['preprocessor'].get_feature_names_out()
-        importances = therapy_pathline_model.named_steps['classifier'].feature_importances_
-        sorted_features = sorted(zip(feature_names, importances), key=lambda x: x[1], reverse=True)
-        top_factors = [{"feature": name, "importance": round(score, 4)} for name, score in sorted_features[:5]]
+        llm = await llm_stage.run(get_groq_client().chat.completions.create(
+            model=LLM_MODEL,
+            messages=build_pathline_messages(data, probabilities)
+        ))
+
+        full_reply = llm.choices[0].message.content
+        think_filter = ThinkFilter()
+        insight = think_filter.feed(full_reply) + think_filter.flush()
 
         return {
             "probabilities": probabilities,
             "insight": insight,
-            "top_factors": top_factors
+            "top_factors": models.prepared("therapy_pathline")
         }
 
     except Exception as e:
-        print("❌ LLM Pathline Error:", e)
+        logger.error("LLM pathline error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
+
+
+async def stream_pathline_events(data: PatientData):
+    try:
+        probabilities = (await run_in_threadpool(score_pathlines, [data]))[0]
+        # Scores are ready long before the LLM, so send them first
+        yield sse_event({"probabilities": probabilities, "top_factors": models.prepared("therapy_pathline")}, event="probabilities")
+
+        async for text in stream_llm_tokens(build_pathline_messages(data, probabilities)):
+            yield sse_event({"token": text})
+        yield sse_event({}, event="done")
+
+    except Exception as e:
+        logger.error("LLM pathline stream error: %s", e)
+        yield sse_event({"error": str(e)}, event="error")
+
+
+@app.post("/predict-therapy-pathline/stream")
+async def predict_therapy_pathline_stream(data: PatientData):
+    await run_in_threadpool(check_regimens, [data])
+    return StreamingResponse(stream_pathline_events(data), media_type="text/event-stream", headers=SSE_HEADERS)
@@ -0,0 +1,157 @@
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger("fastapi_app.models")
+
+
+class IncompatibleModel(ValueError):
+    pass
+
+
+def signature(model) -> tuple:
+    # What callers rely on: the estimator family and the input width
+    estimator = model.steps[-1][1] if hasattr(model, "steps") else model
+    return type(model).__name__, type(estimator).__name__, getattr(model, "n_features_in_", None)
+
+
+class ModelRegistry:
+    """Named joblib models, loaded on first use and swappable at runtime.
+
+    With ``mmap_mode="r"`` the numpy arrays inside an uncompressed pickle are
+    memory-mapped read-only, so every worker on the host shares the same
+    page-cache copy instead of holding its own. ``prepare`` runs once per
+    load and its result (e.g. a feature-importance ranking) travels with
+    the model version it was computed from.
+
+    Each worker process has its own registry. A reload is published to the
+    ``manifest`` file, and ``refresh()`` (polled in every worker) picks up
+    manifest changes and pickles replaced in place, so all workers converge
+    on the same version.
+    """
+
+    def __init__(self, mmap_mode=None, manifest=None):
+        self.mmap_mode = mmap_mode
+        self.manifest = manifest
+        self._specs = {}
+        self._loaded = {}
+        # name -> (path, mtime) whose load failed, so refresh() doesn't retry it every poll
+        self._failed = {}
+        self._lock = threading.Lock()
+
+    def _read_manifest(self) -> dict:
+        if not self.manifest:
+            return {}
+        try:
+            with open(self.manifest) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_manifest(self):
+        paths = {name: spec["path"] for name, spec in self._specs.items()}
+        tmp = f"{self.manifest}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(paths, f, indent=2)
+        os.replace(tmp, self.manifest)
+
+    def register(self, name, path, prepare=None):
+        # A published reload outlives restarts
+        path = self._read_manifest().get(name, path)
+        self._specs[name] = {"path": path, "prepare": prepare}
+
+    def _load(self, name, path) -> dict:
+        # joblib pulls in sklearn on unpickling; keep both off the import path
+        import joblib
+
+        start = time.perf_counter()
+        model = joblib.load(path, mmap_mode=self.mmap_mode)
+        prepare = self._specs[name]["prepare"]
+        return {
+            "model": model,
+            "prepared": prepare(model) if prepare else None,
+            "path": path,
+            "version": int(os.path.getmtime(path)),
+            "mtime_ns": os.stat(path).st_mtime_ns,
+            "loaded_at": time.time(),
+            "load_seconds": round(time.perf_counter() - start, 4),
+        }
+
+    def _entry(self, name) -> dict:
+        entry = self._loaded.get(name)
+        if entry is None:
+            with self._lock:
+                entry = self._loaded.get(name)
+                if entry is None:
+                    if name not in self._specs:
+                        raise KeyError(f"Unknown model '{name}'")
+                    entry = self._loaded[name] = self._load(name, self._specs[name]["path"])
+        return entry
+
+    def get(self, name):
+        return self._entry(name)["model"]
+
+    def prepared(self, name):
+        return self._entry(name)["prepared"]
+
+    def reload(self, name, path=None, publish=True) -> dict:
+        if name not in self._specs:
+            raise KeyError(f"Unknown model '{name}'")
+        path = path or self._specs[name]["path"]
+
+        # Load outside the lock; requests keep using the old version until the swap
+        entry = self._load(name, path)
+        current = self._loaded.get(name)
+        if current is None:
+            try:
+                current = self._entry(name)
+            except Exception:
+                current = None  # nothing servable to stay compatible with
+        if current is not None and signature(entry["model"]) != signature(current["model"]):
+            raise IncompatibleModel(
+                f"{path} is {signature(entry['model'])}, but '{name}' serves {signature(current['model'])}"
+            )
+
+        with self._lock:
+            self._specs[name]["path"] = path
+            self._loaded[name] = entry
+            self._failed.pop(name, None)
+            if publish and self.manifest:
+                self._write_manifest()
+        return self.info()[name]
+
+    def refresh(self) -> list:
+        """Reload loaded models whose manifest path or file changed; returns their names."""
+        manifest = self._read_manifest()
+        reloaded = []
+        for name, entry in list(self._loaded.items()):
+            path = manifest.get(name, self._specs[name]["path"])
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+            if (path, mtime) in ((entry["path"], entry["mtime_ns"]), self._failed.get(name)):
+                continue
+            try:
+                self.reload(name, path, publish=False)
+                reloaded.append(name)
+                logger.info("Picked up model %s from %s", name, path)
+            except Exception as e:
+                self._failed[name] = (path, mtime)
+                logger.warning("Could not pick up model %s from %s: %s", name, path, e)
+        return reloaded
+
+    def info(self) -> dict:
+        status = {}
+        for name, spec in self._specs.items():
+            entry = self._loaded.get(name)
+            status[name] = {"path": spec["path"], "loaded": entry is not None}
+            if entry is not None:
+                status[name].update(
+                    version=entry["version"],
+                    loaded_at=entry["loaded_at"],
+                    load_seconds=entry["load_seconds"],
+                )
+        return status
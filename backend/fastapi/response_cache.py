@@ -0,0 +1,189 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+def digest(*parts) -> str:
+    return hashlib.sha256(json.dumps(parts, default=str).encode("utf-8")).hexdigest()
+
+
+class ScopeIndex:
+    """Unit embeddings of one scope's entries, packed into a preallocated matrix.
+
+    Rows stay contiguous: a removed row is filled with the last one, so a
+    lookup is a single matrix-vector product over ``vectors[:len(keys)]``.
+    """
+
+    def __init__(self, dim: int, capacity=16):
+        self.vectors = np.empty((capacity, dim), dtype=np.float32)
+        self.created = np.empty(capacity)
+        self.keys = []
+        self.rows = {}
+
+    def add(self, key: str, vector: np.ndarray, created_at: float):
+        row = self.rows.get(key)
+        if row is None:
+            row = len(self.keys)
+            if row == len(self.vectors):
+                vectors = np.empty((2 * row, self.vectors.shape[1]), dtype=np.float32)
+                vectors[:row] = self.vectors
+                self.vectors = vectors
+                self.created = np.concatenate([self.created, np.empty(row)])
+            self.keys.append(key)
+            self.rows[key] = row
+        self.vectors[row] = vector
+        self.created[row] = created_at
+
+    def remove(self, key: str):
+        row = self.rows.pop(key)
+        last = self.keys.pop()
+        if last != key:
+            self.vectors[row] = self.vectors[len(self.keys)]
+            self.created[row] = self.created[len(self.keys)]
+            self.keys[row] = last
+            self.rows[last] = row
+
+    def best(self, query: np.ndarray, oldest=None):
+        """(key, cosine score) of the closest row; rows created before ``oldest`` are skipped."""
+        size = len(self.keys)
+        scores = self.vectors[:size] @ query
+        if oldest is not None:
+            scores[self.created[:size] < oldest] = -np.inf
+        row = int(np.argmax(scores))
+        return self.keys[row], scores[row]
+
+
+class ResponseCache:
+    """LRU/TTL cache of generated RAG responses.
+
+    Exact lookups use a hash of everything that shapes the completion:
+    question, patient context, retrieved chunk ids, model and temperature.
+    Semantic lookups compare the question embedding against entries in the
+    same scope (patient and model settings). Any entry at or above
+    ``semantic_threshold`` cosine similarity is reused. 0 disables them.
+    """
+
+    def __init__(self, max_entries=1024, ttl=3600, semantic_threshold=0.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.semantic_threshold = semantic_threshold
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+        # key -> (response, created_at, scope, unit embedding or None, patient_id)
+        self._entries = OrderedDict()
+        # scope -> ScopeIndex of the entries that carry an embedding
+        self._scopes = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(question, patient_context, chunk_ids, model, temperature) -> str:
+        return digest(question, patient_context, list(chunk_ids), model, temperature)
+
+    @staticmethod
+    def scope(patient_context, patient_id, model, temperature) -> str:
+        return digest(patient_context, patient_id, model, temperature)
+
+    def _expired(self, created_at: float) -> bool:
+        return bool(self.ttl) and time.time() - created_at > self.ttl
+
+    def _drop(self, key: str):
+        entry = self._entries.pop(key)
+        index = self._scopes.get(entry[2])
+        if index is not None and key in index.rows:
+            index.remove(key)
+            if not index.keys:
+                del self._scopes[entry[2]]
+
+    def _exact(self, key: str):
+        entry = self._entries.get(key)
+        if entry is not None and self._expired(entry[1]):
+            self._drop(key)
+            return None
+        return key if entry is not None else None
+
+    def _similar(self, scope: str, embedding):
+        index = self._scopes.get(scope)
+        if index is None:
+            return None
+
+        query = np.asarray(embedding, dtype=np.float32)
+        query /= np.linalg.norm(query) or 1
+        key, score = index.best(query, time.time() - self.ttl if self.ttl else None)
+        return key if score >= self.semantic_threshold else None
+
+    def lookup(self, key: str, scope=None, embedding=None):
+        with self._lock:
+            hit = self._exact(key)
+            if hit is not None:
+                self.exact_hits += 1
+            elif self.semantic_threshold and scope is not None and embedding is not None:
+                hit = self._similar(scope, embedding)
+                if hit is not None:
+                    self.semantic_hits += 1
+
+            if hit is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(hit)
+            return self._entries[hit][0]
+
+    def put(self, key: str, response, scope=None, embedding=None, patient_id=None):
+        vector = None
+        if embedding is not None:
+            vector = np.asarray(embedding, dtype=np.float32)
+            vector /= np.linalg.norm(vector) or 1
+
+        with self._lock:
+            patient_id = str(patient_id) if patient_id is not None else None
+            created_at = time.time()
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (response, created_at, scope, vector, patient_id)
+            if vector is not None and scope is not None:
+                if scope not in self._scopes:
+                    self._scopes[scope] = ScopeIndex(len(vector))
+                self._scopes[scope].add(key, vector, created_at)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate_patient(self, patient_id) -> int:
+        patient_id = str(patient_id)
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if entry[4] == patient_id]
+            for key in stale:
+                self._drop(key)
+            self.invalidations += len(stale)
+            return len(stale)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._scopes.clear()
+
+    def stats(self) -> dict:
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        return {
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": round((self.exact_hits + self.semantic_hits) / lookups, 4) if lookups else 0.0,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "semantic_threshold": self.semantic_threshold,
+        }
@@ -0,0 +1,87 @@
+import json
+
+THINK_OPEN = "<think>"
+THINK_CLOSE = "</think>"
+
+# Headers that keep proxies (nginx, Azure) from buffering the event stream
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def sse_event(data, event=None) -> str:
+    lines = [f"event: {event}"] if event else []
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def partial_tag_length(text: str, tag: str) -> int:
+    # Length of the longest suffix of text that could be the start of tag
+    for size in range(min(len(text), len(tag) - 1), 0, -1):
+        if tag.startswith(text[-size:]):
+            return size
+    return 0
+
+
+class ThinkFilter:
+    """Drops ``<think>…</think>`` spans from a token stream as it arrives.
+
+    Text that might be the start of a tag is held back until the next chunk
+    decides it, so tags split across chunks are still removed. Leading
+    whitespace of the visible reply is dropped, like ``str.strip`` did on
+    the buffered reply.
+
+    The R1 chat template can put ``<think>`` in the prompt, so the reply may
+    open mid-reasoning and only close it. Until the first tag shows up the
+    text is held back: a ``</think>`` first means it was reasoning, a
+    ``<think>`` or the end of the stream means it was reply.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.thinking = False
+        self.started = False
+        self.decided = False
+
+    def _emit(self, text: str) -> str:
+        if not self.started:
+            text = text.lstrip()
+            self.started = bool(text)
+        return text
+
+    def _decide(self) -> bool:
+        opening = self.buffer.find(THINK_OPEN)
+        closing = self.buffer.find(THINK_CLOSE)
+        if closing >= 0 and (opening < 0 or closing < opening):
+            self.buffer = self.buffer[closing + len(THINK_CLOSE):]
+            self.decided = True
+        elif opening >= 0:
+            self.decided = True
+        return self.decided
+
+    def feed(self, chunk: str) -> str:
+        self.buffer += chunk
+        if not self.decided and not self._decide():
+            return ""
+        visible = []
+
+        while True:
+            tag = THINK_CLOSE if self.thinking else THINK_OPEN
+            position = self.buffer.find(tag)
+            if position >= 0:
+                if not self.thinking:
+                    visible.append(self.buffer[:position])
+                self.buffer = self.buffer[position + len(tag):]
+                self.thinking = not self.thinking
+                continue
+
+            held = partial_tag_length(self.buffer, tag)
+            if not self.thinking:
+                visible.append(self.buffer[:len(self.buffer) - held])
+            self.buffer = self.buffer[len(self.buffer) - held:]
+            break
+
+        return self._emit("".join(visible))
+
+    def flush(self) -> str:
+        rest = "" if self.thinking else self.buffer
+        self.buffer = ""
+        return self._emit(rest).rstrip()
@@ -0,0 +1,34 @@
+import os
+import sys
+
+import pytest
+
+FASTAPI_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The service modules live flat in backend/fastapi, next to this directory
+sys.path.insert(0, FASTAPI_DIR)
+
+
+@pytest.fixture(scope="session")
+def main(tmp_path_factory):
+    # Dummy credentials: nothing in the tests reaches OpenAI, Groq or Pinecone
+    env = {
+        "OPENAI_API_KEY": "test", "GROQ_API_KEY": "test", "PINECONE_API_KEY": "test",
+        "EMBEDDING_CACHE_PATH": "", "MODEL_DIR": FASTAPI_DIR,
+        "MODEL_MANIFEST": os.path.join(tmp_path_factory.mktemp("models"), "models.json"),
+    }
+    saved = {name: os.environ.get(name) for name in env}
+    os.environ.update(env)
+    import main as module
+    yield module
+    for name, value in saved.items():
+        if value is None:
+            os.environ.pop(name, None)
+        else:
+            os.environ[name] = value
+
+
+@pytest.fixture
+def client(main):
+    from fastapi.testclient import TestClient
+    return TestClient(main.app)
@@ -0,0 +1,232 @@
+import asyncio
+import types
+
+import pytest
+
+class FakeLLM:
+    def __init__(self):
+        self.prompts = []
+        self.chat = types.SimpleNamespace(completions=self)
+
+    async def create(self, model, messages, **kwargs):
+        self.prompts.append(messages[-1]["content"])
+        message = types.SimpleNamespace(content=f"<think>...</think>answer {len(self.prompts)}")
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)])
+
+
+
+class StallingLLM:
+    """Streams a couple of tokens, then goes quiet without closing the stream."""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.chat = types.SimpleNamespace(completions=self)
+
+    async def create(self, model, messages, **kwargs):
+        async def chunks():
+            for token in self.tokens:
+                yield types.SimpleNamespace(choices=[types.SimpleNamespace(delta=types.SimpleNamespace(content=token))])
+            await asyncio.sleep(60)
+
+        return chunks()
+
+def test_chatbot_semantic_cache_compares_questions_not_prompts(main, client, monkeypatch):
+    llm = FakeLLM()
+    # Rephrasings of one question share a vector; any other question is orthogonal
+    vectors = {"Why is my glucose high?": [1.0, 0.0], "Why is my sugar high?": [0.99, 0.05]}
+
+    async def embed(text):
+        return vectors.get(text, [0.0, 1.0])
+
+    async def retrieve(query, top_k=3):
+        return [0.5, 0.5], []
+
+    monkeypatch.setattr(main, "get_groq_client", lambda: llm)
+    monkeypatch.setattr(main, "get_openai_embedding", embed)
+    monkeypatch.setattr(main, "retrieve_matches", retrieve)
+    monkeypatch.setattr(main.response_cache, "semantic_threshold", 0.95)
+    main.response_cache.clear()
+
+    patient = {"id": 11, "name": "Ana", "hba1c": 8.1}
+    ask = lambda q: client.post("/chatbot-patient-query", json={"patient": patient, "query": q}).json()["response"]
+
+    first = ask("Why is my glucose high?")
+    other = ask("Should I change my insulin?")
+    rephrased = ask("Why is my sugar high?")
+
+    assert first != other
+    assert rephrased == first
+    assert len(llm.prompts) == 2
+
+
+ROWS = [[8.4, 7.9, 130, 145, 1.1, 0.02], [7.2, 7.0, 110, 120, 0.8, 0.01]]
+
+
+def test_predict_batch_json_rows_and_columns_agree(main, client):
+    by_rows = client.post("/predict/batch", json={"rows": ROWS})
+    by_columns = client.post("/predict/batch", json={"columns": [list(col) for col in zip(*ROWS)]})
+
+    assert by_rows.status_code == 200
+    assert by_rows.json() == by_columns.json()
+    assert len(by_rows.json()["predictions"]) == 2
+
+
+def test_predict_batch_matches_single_predict(client):
+    single = [client.post("/predict", json={"features": row}).json()["prediction"] for row in ROWS]
+    assert client.post("/predict/batch", json={"rows": ROWS}).json()["predictions"] == pytest.approx(single)
+
+
+@pytest.mark.parametrize("body", [
+    {"rows": ROWS, "columns": [[1.0]]},
+    {},
+    {"rows": [[1.0, 2.0]]},
+    {"rows": [ROWS[0], ROWS[1][:3]]},
+    {"rows": []},
+])
+def test_predict_batch_rejects_bad_json(client, body):
+    assert client.post("/predict/batch", json=body).status_code == 422
+
+
+def test_predict_batch_buffer(client):
+    import numpy as np
+
+    body = np.asarray(ROWS, dtype="<f4").tobytes()
+    headers = {"content-type": "application/octet-stream"}
+
+    ok = client.post("/predict/batch?dtype=float32", content=body, headers=headers)
+    assert ok.status_code == 200 and len(ok.json()["predictions"]) == 2
+    assert client.post("/predict/batch?dtype=float32", content=body[:-4], headers=headers).status_code == 422
+    assert client.post("/predict/batch?n_features=-1", content=body, headers=headers).status_code == 422
+    assert client.post("/predict/batch?dtype=int8", content=body, headers=headers).status_code == 422
+
+
+def test_predict_batch_ndjson(client):
+    import json
+
+    body = "\n".join(json.dumps(row) for row in ROWS) + "\n"
+    response = client.post("/predict/batch", content=body, headers={"content-type": "application/x-ndjson"})
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert response.status_code == 200
+    assert [line["prediction"] for line in lines] == client.post("/predict/batch", json={"rows": ROWS}).json()["predictions"]
+    bad = client.post("/predict/batch", content="[1, 2\n", headers={"content-type": "application/x-ndjson"})
+    assert bad.status_code == 422
+
+
+@pytest.fixture
+def internal(main, monkeypatch):
+    monkeypatch.setattr(main, "INTERNAL_API_TOKEN", "secret")
+    return {"X-Internal-Token": "secret"}
+
+
+def test_internal_endpoints_need_the_token(client, internal):
+    assert client.get("/models").status_code == 403
+    assert client.get("/models", headers=internal).status_code == 200
+    assert client.post("/models/risk/reload").status_code == 403
+    assert client.post("/models/risk/reload", headers={"X-Internal-Token": "guess"}).status_code == 403
+    assert client.post("/cache/patients/1/invalidate").status_code == 403
+    assert client.post("/cache/patients/1/invalidate", headers=internal).json() == {"invalidated": 0}
+
+
+def test_internal_endpoints_without_token_only_allow_loopback(client):
+    # TestClient connects as host "testclient", which is not loopback
+    assert client.post("/cache/patients/1/invalidate").status_code == 403
+    assert client.get("/models").status_code == 403
+
+
+def test_reload_rejects_incompatible_model(main, client, internal):
+    response = client.post(
+        "/models/risk/reload", json={"file": "therapy_effectiveness_model.pkl"}, headers=internal
+    )
+
+    assert response.status_code == 422
+    assert main.models.info()["risk"]["path"].endswith("ridge_best_model_1.pkl")
+    assert client.post("/predict", json={"features": ROWS[0]}).status_code == 200
+
+
+def test_reload_same_model(client, internal):
+    response = client.post("/models/risk/reload", headers=internal)
+    assert response.status_code == 200
+    assert response.json()["loaded"] is True
+
+
+@pytest.mark.parametrize("content_type, body", [
+    ("application/json", '{"rows": [[1, 2, 3, 4, 5, 6]]}'),
+    ("application/x-ndjson", "[1, 2, 3, 4, 5, 6]\n"),
+])
+def test_predict_batch_checks_n_features_for_every_body_type(client, content_type, body):
+    headers = {"content-type": content_type}
+    assert client.post("/predict/batch?n_features=6", content=body, headers=headers).status_code == 200
+    assert client.post("/predict/batch?n_features=5", content=body, headers=headers).status_code == 422
+
+
+PATHLINE_PATIENT = {
+    "insulin_regimen": "BB",
+    "hba1c1": 9.1, "hba1c2": 8.4, "hba1c3": 7.8, "hba1c_delta_1_2": 0.7,
+    "gap_initial_visit": 90, "gap_first_clinical": 60, "egfr": 72, "reduction_percent": 14.3,
+    "fvg1": 11.2, "fvg2": 9.6, "fvg3": 8.1, "fvg_delta_1_2": 1.6,
+    "dds1": 3.1, "dds3": 2.4, "dds_trend_1_3": -0.7,
+}
+
+
+def test_stalled_llm_stream_ends_with_error_event(main, client, monkeypatch):
+    monkeypatch.setattr(main, "get_groq_client", lambda: StallingLLM(["<think>plan</think>", "Lower ", "basal."]))
+    monkeypatch.setattr(main.llm_stage, "timeout", 0.2)
+
+    response = client.post("/predict-therapy-pathline/stream", json=PATHLINE_PATIENT)
+
+    assert response.status_code == 200
+    assert 'data: {"token": "Lower "}' in response.text
+    assert "event: error" in response.text
+    assert "llm_call timed out" in response.text
+
+
+def test_stage_stream_holds_nothing_while_the_consumer_works(main):
+    stage = main.Stage("llm_call", 0.2, 1)
+
+    async def upstream():
+        for token in ["a", "b", "c"]:
+            yield token
+
+    async def consume():
+        seen = []
+        async for token in stage.stream(asyncio.sleep(0, upstream())):
+            assert not stage.semaphore.locked()
+            seen.append(token)
+            # Past the deadline: the next read fails, this sleep is never cancelled
+            await asyncio.sleep(0.3 if token == "b" else 0)
+        return seen
+
+    with pytest.raises(TimeoutError, match="timed out"):
+        asyncio.run(consume())
+
+
+def test_lifespan_preloads_watches_and_cleans_up(main, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    events = []
+
+    async def watch_models():
+        events.append("watching")
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            events.append("watcher cancelled")
+            raise
+
+    class HTTPClient:
+        async def aclose(self):
+            events.append("http client closed")
+
+    monkeypatch.setenv("MODEL_PRELOAD", "1")
+    monkeypatch.setattr(main.models, "get", lambda name: events.append(f"loaded {name}"))
+    monkeypatch.setattr(main, "watch_models", watch_models)
+    # Keep the shared client open for the other tests
+    monkeypatch.setattr(main, "http_client", HTTPClient())
+
+    with TestClient(main.app) as client:
+        client.get("/metrics")
+
+    assert events == [
+        "loaded risk", "loaded therapy_pathline", "watching", "watcher cancelled", "http client closed",
+    ]
@@ -0,0 +1,94 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bench"))
+
+from compare import compare  # noqa: E402
+from load import check_rag_response, run_load  # noqa: E402
+
+
+def result(path="/rag", requests=32, errors=0, p95=400.0, rps=20.0, first_error=None):
+    return {
+        "path": path, "concurrency": 8, "requests": requests, "errors": errors,
+        "error_rate": errors / requests, "first_error": first_error,
+        "p50_ms": p95 * 0.9, "p95_ms": p95, "p99_ms": p95 * 1.05, "throughput_rps": rps,
+    }
+
+
+def report(*runs, rss=200.0):
+    return {"results": list(runs), "memory": {"idle": {"max_rss_mb": rss}, "loaded": {"max_rss_mb": rss}}}
+
+
+@pytest.mark.parametrize("body, ok", [
+    ({"response": "Increase basal."}, True),
+    ({"response": {"response": "Nested /rag reply", "context_used": ""}}, True),
+    ({"response": "❌ AI backend error: llm_call timed out after 0.01s"}, False),
+    ({"response": {"response": "❌ AI backend error: boom"}}, False),
+    ({"response": ""}, False),
+    ({}, False),
+])
+def test_check_rag_response(body, ok):
+    assert (check_rag_response(body) is None) == ok
+
+
+def test_in_band_rag_errors_count_as_errors(monkeypatch):
+    import httpx
+    from fastapi import FastAPI
+
+    app = FastAPI()
+
+    @app.post("/rag")
+    def rag():
+        return {"response": {"response": "❌ AI backend error: llm_call timed out after 0.01s"}}
+
+    # Route run_load's client to the in-process app instead of the network
+    original = httpx.AsyncClient.__init__
+    monkeypatch.setattr(
+        httpx.AsyncClient, "__init__",
+        lambda self, *args, **kwargs: original(self, *args, transport=httpx.ASGITransport(app=app), **kwargs),
+    )
+    summary = asyncio.run(run_load("http://bench", "/rag", lambda i: {"query": "q"}, 2, 4, check=check_rag_response))
+
+    assert summary["errors"] == 4
+    assert summary["error_rate"] == 1.0
+    assert "timed out" in summary["first_error"]
+
+
+def test_unchanged_run_has_no_regressions():
+    baseline = report(result())
+    assert compare(baseline, report(result())) == []
+
+
+def test_broken_rag_path_is_a_regression():
+    baseline = report(result())
+    current = report(result(errors=32, first_error="❌ AI backend error: llm_call timed out"))
+
+    regressions = compare(baseline, current)
+    assert len(regressions) == 1
+    assert "all 32 requests failed" in regressions[0]
+    assert "timed out" in regressions[0]
+
+
+def test_all_failing_run_is_flagged_even_without_baseline_entry():
+    assert compare(report(), report(result(errors=32)))
+
+
+def test_error_rate_increase_is_a_regression():
+    regressions = compare(report(result(requests=32, errors=0)), report(result(requests=64, errors=2)))
+    assert any("error rate" in line for line in regressions)
+    # Same rate at a different request count is not
+    assert compare(report(result(requests=32, errors=1)), report(result(requests=64, errors=2))) == []
+
+
+def test_latency_throughput_and_memory_regressions():
+    regressions = compare(report(result()), report(result(p95=600.0, rps=10.0), rss=300.0))
+    assert any("p95_ms" in line for line in regressions)
+    assert any("throughput_rps" in line for line in regressions)
+    assert any("memory" in line for line in regressions)
+
+
+def test_small_absolute_latency_changes_are_ignored():
+    assert compare(report(result(p95=2.0)), report(result(p95=4.0))) == []
@@ -0,0 +1,174 @@
+import asyncio
+import sqlite3
+import threading
+import time
+
+import pytest
+
+import embedding_cache
+from embedding_cache import EmbeddingCache, cache_key
+
+MODEL = "text-embedding-3-small"
+
+
+class StubEmbedder:
+    """Async stand-in for the OpenAI call: deterministic vectors, counts calls."""
+
+    def __init__(self):
+        self.calls = []
+
+    async def __call__(self, text):
+        self.calls.append(text)
+        return [float(len(text)), 1.0, 0.5]
+
+
+def embed(cache, text, embedder):
+    return asyncio.run(cache.get_or_compute(MODEL, text, embedder))
+
+
+def test_cache_key_ignores_whitespace_but_not_case():
+    assert cache_key(MODEL, "  HbA1c   target ") == cache_key(MODEL, "HbA1c target")
+    assert cache_key(MODEL, "hba1c target") != cache_key(MODEL, "HbA1c target")
+    assert cache_key("other-model", "HbA1c target") != cache_key(MODEL, "HbA1c target")
+
+
+def test_memory_hit_skips_compute():
+    cache = EmbeddingCache()
+    embedder = StubEmbedder()
+
+    first = embed(cache, "insulin dose", embedder)
+    second = embed(cache, "insulin  dose", embedder)
+
+    assert first == second == [12.0, 1.0, 0.5]
+    assert embedder.calls == ["insulin dose"]
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_lru_evicts_least_recently_used():
+    cache = EmbeddingCache(max_entries=2)
+    embedder = StubEmbedder()
+
+    embed(cache, "a", embedder)
+    embed(cache, "b", embedder)
+    embed(cache, "a", embedder)  # refreshes "a"
+    embed(cache, "c", embedder)  # evicts "b"
+    embed(cache, "a", embedder)
+    embed(cache, "b", embedder)
+
+    assert embedder.calls == ["a", "b", "c", "b"]
+    assert cache.stats()["evictions"] == 2
+    assert cache.stats()["memory_entries"] == 2
+
+
+def test_ttl_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(embedding_cache.time, "time", lambda: now[0])
+    cache = EmbeddingCache(ttl=60)
+    embedder = StubEmbedder()
+
+    embed(cache, "fasting glucose", embedder)
+    now[0] += 30
+    embed(cache, "fasting glucose", embedder)
+    now[0] += 61
+    embed(cache, "fasting glucose", embedder)
+
+    assert len(embedder.calls) == 2
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+
+def test_disk_persists_across_instances(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite3")
+    embedder = StubEmbedder()
+
+    embed(EmbeddingCache(path), "eGFR decline", embedder)
+    reopened = EmbeddingCache(path)
+    vector = embed(reopened, "eGFR decline", embedder)
+
+    assert vector == pytest.approx([12.0, 1.0, 0.5])
+    assert embedder.calls == ["eGFR decline"]
+    assert reopened.stats()["disk_hits"] == 1
+    # The disk hit is promoted into memory
+    embed(reopened, "eGFR decline", embedder)
+    assert reopened.stats()["hits"] == 1
+
+
+def test_disk_is_bounded(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite3"), max_entries=1, max_disk_entries=2)
+    embedder = StubEmbedder()
+
+    for text in ["one", "two", "three"]:
+        embed(cache, text, embedder)
+
+    (count,) = cache._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+    assert count == 2
+
+
+def test_compute_errors_are_not_cached():
+    cache = EmbeddingCache()
+
+    async def failing(text):
+        raise TimeoutError("embedding timed out")
+
+    with pytest.raises(TimeoutError):
+        embed(cache, "retry me", failing)
+    assert embed(cache, "retry me", StubEmbedder()) == [8.0, 1.0, 0.5]
+
+
+def test_running_disk_count_tracks_inserts_and_updates(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(embedding_cache.time, "time", lambda: now[0])
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite3"), max_disk_entries=10, ttl=60)
+    embedder = StubEmbedder()
+
+    embed(cache, "one", embedder)
+    embed(cache, "two", embedder)
+    now[0] += 61
+    # "one" is recomputed over its expired row (an update), then "two" expires off disk
+    embed(cache, "one", embedder)
+    embed(cache, "three", embedder)
+
+    (count,) = cache._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+    assert embedder.calls == ["one", "two", "one", "three"]
+    assert cache._disk_count == count == 2
+
+
+def test_disk_failure_degrades_to_memory(tmp_path, caplog):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite3"))
+    cache._db.close()
+    embedder = StubEmbedder()
+
+    assert embed(cache, "locked database", embedder) == [15.0, 1.0, 0.5]
+    assert embed(cache, "locked database", embedder) == [15.0, 1.0, 0.5]
+
+    assert embedder.calls == ["locked database"]
+    assert "Embedding cache read failed" in caplog.text
+    assert "Embedding cache write failed" in caplog.text
+
+
+def test_memory_hit_does_not_wait_for_a_locked_database(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite3")
+    cache = EmbeddingCache(path, timeout=2)
+    embedder = StubEmbedder()
+    embed(cache, "cached", embedder)
+
+    # Another worker holds the write lock, so the next disk write waits out the busy timeout
+    other = sqlite3.connect(path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+    writer = threading.Thread(target=embed, args=(cache, "uncached", embedder))
+    writer.start()
+    deadline = time.monotonic() + 2
+    while not cache._db_lock.locked() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert cache._db_lock.locked()
+
+    start = time.monotonic()
+    assert embed(cache, "cached", embedder) == [6.0, 1.0, 0.5]
+    assert time.monotonic() - start < 0.5
+
+    other.execute("ROLLBACK")
+    writer.join()
+    other.close()
+    (count,) = cache._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+    assert count == 2
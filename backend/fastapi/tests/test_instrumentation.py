@@ -0,0 +1,104 @@
+import logging
+
+import pytest
+
+import instrumentation
+from instrumentation import Counter, Histogram, SampleFilter, instrument_requests
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("latency_seconds", "Latency.", ("stage",), buckets=(0.1, 1))
+    for value in (0.05, 0.5, 0.5, 3):
+        histogram.observe(value, "llm")
+
+    assert histogram.render() == [
+        "# HELP latency_seconds Latency.",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{stage="llm",le="0.1"} 1',
+        'latency_seconds_bucket{stage="llm",le="1"} 3',
+        'latency_seconds_bucket{stage="llm",le="+Inf"} 4',
+        'latency_seconds_sum{stage="llm"} 4.05',
+        'latency_seconds_count{stage="llm"} 4',
+    ]
+
+
+def test_counter_renders_one_line_per_label_set():
+    counter = Counter("errors_total", "Errors.", ("stage",))
+    counter.inc("llm")
+    counter.inc("embedding", amount=2)
+    counter.inc("llm")
+
+    assert counter.render() == [
+        "# HELP errors_total Errors.",
+        "# TYPE errors_total counter",
+        'errors_total{stage="embedding"} 2',
+        'errors_total{stage="llm"} 2',
+    ]
+
+
+def test_counter_without_labels():
+    counter = Counter("reloads_total", "Reloads.")
+    counter.inc()
+    assert counter.render()[-1] == "reloads_total 1"
+
+
+@pytest.fixture
+def client():
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    app = FastAPI()
+    app.middleware("http")(instrument_requests)
+
+    @app.get("/patients/{patient_id}")
+    def patient(patient_id: str):
+        return {"request_id": instrumentation.request_id_var.get()}
+
+    return TestClient(app)
+
+
+def test_request_id_is_echoed(client):
+    response = client.get("/patients/7", headers={"X-Request-ID": "abc123"})
+
+    assert response.headers["X-Request-ID"] == "abc123"
+    assert response.json() == {"request_id": "abc123"}
+
+
+def test_request_id_is_generated_when_missing(client):
+    first = client.get("/patients/7")
+    second = client.get("/patients/7")
+
+    assert len(first.headers["X-Request-ID"]) == 32
+    assert first.headers["X-Request-ID"] != second.headers["X-Request-ID"]
+    assert first.json()["request_id"] == first.headers["X-Request-ID"]
+
+
+def test_requests_are_labelled_by_route_template(client):
+    counts = instrumentation.http_requests._values
+    matched = ("GET", "/patients/{patient_id}", 200)
+    unmatched = ("GET", "unmatched", 404)
+    before = counts.get(matched, 0), counts.get(unmatched, 0)
+
+    client.get("/patients/7")
+    client.get("/patients/8")
+    client.get("/no/such/route")
+
+    assert (counts.get(matched, 0), counts.get(unmatched, 0)) == (before[0] + 2, before[1] + 1)
+    assert not any("/patients/7" in labels for labels in counts)
+
+
+def record(level):
+    return logging.LogRecord("fastapi_app.hotpath", level, __file__, 1, "message", None, None)
+
+
+def test_sample_filter_at_rate_zero_keeps_only_warnings():
+    sample = SampleFilter(0)
+
+    assert not sample.filter(record(logging.DEBUG))
+    assert not sample.filter(record(logging.INFO))
+    assert sample.filter(record(logging.WARNING))
+    assert sample.filter(record(logging.ERROR))
+
+
+def test_sample_filter_at_rate_one_keeps_everything():
+    assert SampleFilter(1).filter(record(logging.DEBUG))
@@ -0,0 +1,100 @@
+import os
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.linear_model import LogisticRegression, Ridge
+
+from model_registry import IncompatibleModel, ModelRegistry
+
+
+def fit_ridge(path, n_features=3, offset=0.0):
+    X = np.arange(12 * n_features, dtype=float).reshape(12, n_features)
+    joblib.dump(Ridge().fit(X, X.sum(axis=1) + offset), path)
+    return path
+
+
+def bump_mtime(path, seconds=10):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + seconds * 10**9))
+
+
+@pytest.fixture
+def workers(tmp_path):
+    # Two registries sharing one manifest stand in for two server workers
+    fit_ridge(tmp_path / "v1.pkl")
+    manifest = str(tmp_path / "models.json")
+    registries = [ModelRegistry(mmap_mode="r", manifest=manifest) for _ in range(2)]
+    for registry in registries:
+        registry.register("risk", str(tmp_path / "v1.pkl"))
+    return tmp_path, registries
+
+
+def test_lazy_load_and_prepare(tmp_path):
+    registry = ModelRegistry()
+    registry.register("risk", fit_ridge(tmp_path / "m.pkl"), prepare=lambda model: model.n_features_in_)
+
+    assert registry.info()["risk"]["loaded"] is False
+    assert registry.prepared("risk") == 3
+    assert registry.info()["risk"]["loaded"] is True
+    with pytest.raises(KeyError):
+        registry.get("missing")
+
+
+def test_mmap_mode_memory_maps_arrays(tmp_path):
+    registry = ModelRegistry(mmap_mode="r")
+    registry.register("risk", fit_ridge(tmp_path / "m.pkl"))
+    assert isinstance(registry.get("risk").coef_, np.memmap)
+
+
+def test_reload_is_published_to_other_workers(workers):
+    tmp_path, (first, second) = workers
+    old = second.get("risk")
+    fit_ridge(tmp_path / "v2.pkl", offset=100)
+
+    first.reload("risk", str(tmp_path / "v2.pkl"))
+    assert second.get("risk") is old
+
+    assert second.refresh() == ["risk"]
+    assert second.info()["risk"]["path"].endswith("v2.pkl")
+    assert second.refresh() == []
+
+
+def test_file_replaced_in_place_is_picked_up(workers):
+    tmp_path, (_, worker) = workers
+    before = worker.get("risk").predict([[1.0, 2.0, 3.0]])[0]
+
+    fit_ridge(tmp_path / "v1.pkl", offset=100)
+    bump_mtime(tmp_path / "v1.pkl")
+
+    assert worker.refresh() == ["risk"]
+    assert worker.get("risk").predict([[1.0, 2.0, 3.0]])[0] == pytest.approx(before + 100, rel=1e-3)
+
+
+def test_incompatible_models_are_refused(workers):
+    tmp_path, (first, second) = workers
+    second.get("risk")
+    fit_ridge(tmp_path / "wide.pkl", n_features=4)
+    joblib.dump(LogisticRegression().fit([[0, 0, 0], [1, 1, 1]], [0, 1]), tmp_path / "clf.pkl")
+
+    for bad in ("wide.pkl", "clf.pkl"):
+        with pytest.raises(IncompatibleModel):
+            first.reload("risk", str(tmp_path / bad))
+    assert first.info()["risk"]["path"].endswith("v1.pkl")
+
+    # A bad file dropped in place is skipped by refresh, and not retried until it changes again
+    fit_ridge(tmp_path / "v1.pkl", n_features=4)
+    bump_mtime(tmp_path / "v1.pkl")
+    assert second.refresh() == []
+    assert second.refresh() == []
+    assert second.get("risk").n_features_in_ == 3
+
+
+def test_manifest_survives_restart(workers):
+    tmp_path, (first, _) = workers
+    fit_ridge(tmp_path / "v2.pkl")
+    first.reload("risk", str(tmp_path / "v2.pkl"))
+
+    restarted = ModelRegistry(manifest=first.manifest)
+    restarted.register("risk", str(tmp_path / "v1.pkl"))
+    assert restarted.info()["risk"]["path"].endswith("v2.pkl")
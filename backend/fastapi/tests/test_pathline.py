@@ -0,0 +1,88 @@
+import pytest
+from fastapi import HTTPException
+
+
+def patient(main, regimen, hba1c, egfr):
+    return main.PatientData(
+        insulin_regimen=regimen,
+        hba1c1=hba1c, hba1c2=hba1c - 0.6, hba1c3=hba1c - 1.1,
+        hba1c_delta_1_2=0.6,
+        gap_initial_visit=90, gap_first_clinical=60,
+        egfr=egfr, reduction_percent=12.5,
+        fvg1=11.2, fvg2=9.6, fvg3=8.1,
+        fvg_delta_1_2=1.6,
+        dds1=3.1, dds3=2.4, dds_trend_1_3=-0.7,
+    )
+
+
+def per_visit_loop(model, d):
+    # The original single-patient scoring: one predict_proba per visit
+    import pandas as pd
+
+    df = pd.DataFrame({
+        'INSULIN REGIMEN': [d.insulin_regimen], 'HbA1c1': [d.hba1c1], 'HbA1c2': [d.hba1c2],
+        'HbA1c3': [d.hba1c3], 'HbA1c_Delta_1_2': [d.hba1c_delta_1_2],
+        'Gap from initial visit (days)': [d.gap_initial_visit],
+        'Gap from first clinical visit (days)': [d.gap_first_clinical], 'eGFR': [d.egfr],
+        'Reduction (%)': [d.reduction_percent], 'FVG1': [d.fvg1], 'FVG2': [d.fvg2], 'FVG3': [d.fvg3],
+        'FVG_Delta_1_2': [d.fvg_delta_1_2], 'DDS1': [d.dds1], 'DDS3': [d.dds3],
+        'DDS_Trend_1_3': [d.dds_trend_1_3],
+    })
+    probs = []
+    for val in [d.hba1c1, d.hba1c2, d.hba1c3]:
+        df['HbA1c1'] = [val]
+        probs.append(round(model.predict_proba(df)[0][1], 3))
+    return probs
+
+
+def test_score_pathlines_matches_per_visit_loop(main):
+    patients = [
+        patient(main, "BB", 9.4, 72),
+        patient(main, "PBD", 8.1, 45),
+        patient(main, "PTDS", 10.6, 95),
+        patient(main, "BB", 7.2, 30),
+    ]
+    model = main.models.get("therapy_pathline")
+
+    scores = main.score_pathlines(patients)
+
+    assert scores == [per_visit_loop(model, p) for p in patients]
+    # Rows must not bleed into each other: different patients, different curves
+    assert len({tuple(s) for s in scores}) > 1
+
+
+def test_check_regimens_names_unknown_patients(main):
+    patients = [patient(main, "BB", 9.4, 72), patient(main, "XYZ", 8.1, 45)]
+
+    with pytest.raises(HTTPException) as err:
+        main.check_regimens(patients)
+
+    assert err.value.status_code == 422
+    assert "[1]" in err.value.detail
+
+
+def test_check_regimens_accepts_known_regimens(main):
+    main.check_regimens([patient(main, r, 9.0, 60) for r in ("BB", "PBD", "PTDS")])
+
+
+def test_pathline_batch_rejects_unknown_regimen(main, client):
+    patients = [patient(main, "PBD", 9.4, 72).model_dump(), patient(main, "XYZ", 8.1, 45).model_dump()]
+
+    response = client.post("/predict-therapy-pathline/batch", json={"patients": patients})
+
+    assert response.status_code == 422
+    assert "[1]" in response.json()["detail"]
+
+
+def test_pathline_batch_rejects_empty_list(client):
+    response = client.post("/predict-therapy-pathline/batch", json={"patients": []})
+    assert response.status_code == 422
+
+
+def test_pathline_batch_scores_every_patient(main, client):
+    patients = [patient(main, "BB", 9.4, 72), patient(main, "PTDS", 10.6, 95)]
+
+    response = client.post("/predict-therapy-pathline/batch", json={"patients": [p.model_dump() for p in patients]})
+
+    assert response.status_code == 200
+    assert [r["probabilities"] for r in response.json()["results"]] == main.score_pathlines(patients)
@@ -0,0 +1,122 @@
+import pytest
+
+import response_cache
+from response_cache import ResponseCache
+
+SETTINGS = ("deepseek-r1-distill-llama-70b", 0.7)
+
+
+def key(question, chunks=("c1", "c2")):
+    return ResponseCache.key(question, "age: 58", chunks, *SETTINGS)
+
+
+def scope(patient_id="p1"):
+    return ResponseCache.scope("age: 58", patient_id, *SETTINGS)
+
+
+def test_exact_hit_and_miss():
+    cache = ResponseCache()
+    cache.put(key("q"), {"response": "a"})
+
+    assert cache.lookup(key("q")) == {"response": "a"}
+    assert cache.lookup(key("q", chunks=("c3",))) is None
+    assert cache.stats()["exact_hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_lru_eviction():
+    cache = ResponseCache(max_entries=2)
+    for question in ["a", "b"]:
+        cache.put(key(question), question)
+    cache.lookup(key("a"))
+    cache.put(key("c"), "c")
+
+    assert cache.lookup(key("b")) is None
+    assert cache.lookup(key("a")) == "a"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, "time", lambda: now[0])
+    cache = ResponseCache(ttl=60)
+    cache.put(key("q"), "a")
+
+    now[0] += 61
+    assert cache.lookup(key("q")) is None
+    assert len(cache) == 0
+
+
+def test_semantic_hit_needs_threshold_and_same_scope():
+    cache = ResponseCache(semantic_threshold=0.95)
+    cache.put(key("Why is my glucose high?"), "a", scope(), [1.0, 0.0, 0.0])
+
+    assert cache.lookup(key("Why is my sugar high?"), scope(), [0.99, 0.05, 0.0]) == "a"
+    assert cache.lookup(key("Should I exercise?"), scope(), [0.0, 1.0, 0.0]) is None
+    assert cache.lookup(key("Why is my sugar high?"), scope("p2"), [0.99, 0.05, 0.0]) is None
+    assert cache.stats()["semantic_hits"] == 1
+
+
+def test_semantic_disabled_by_default():
+    cache = ResponseCache()
+    cache.put(key("q1"), "a", scope(), [1.0, 0.0])
+    assert cache.lookup(key("q2"), scope(), [1.0, 0.0]) is None
+
+
+def test_invalidate_patient():
+    cache = ResponseCache()
+    cache.put(key("q1"), "a", patient_id=7)
+    cache.put(key("q2"), "b", patient_id="8")
+
+    assert cache.invalidate_patient("7") == 1
+    assert cache.lookup(key("q1")) is None
+    assert cache.lookup(key("q2")) == "b"
+    assert cache.stats()["invalidations"] == 1
+
+
+@pytest.mark.parametrize("part", range(5))
+def test_key_depends_on_every_part(part):
+    parts = ["q", "ctx", ["c1"], "model", 0.7]
+    changed = list(parts)
+    changed[part] = ["c2"] if part == 2 else ("other" if part != 4 else 0.2)
+    assert ResponseCache.key(*parts) != ResponseCache.key(*changed)
+
+
+def unit(i, dim=40):
+    vector = [0.0] * dim
+    vector[i] = 1.0
+    return vector
+
+
+def test_semantic_index_follows_evictions_and_invalidations():
+    cache = ResponseCache(max_entries=30, semantic_threshold=0.95)
+    # More entries than the index starts with, so it has to grow
+    for i in range(30):
+        cache.put(key(f"q{i}"), f"a{i}", scope(), unit(i), patient_id=i % 3)
+    cache.put(key("q30"), "a30", scope(), unit(30), patient_id=0)  # evicts q0
+
+    assert cache.invalidate_patient(1) == 10
+    for i in range(31):
+        expected = None if i == 0 or i % 3 == 1 else f"a{i}"
+        assert cache.lookup(key("rephrased"), scope(), unit(i)) == expected
+
+
+def test_semantic_hit_skips_expired_entries(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, "time", lambda: now[0])
+    cache = ResponseCache(ttl=60, semantic_threshold=0.95)
+    cache.put(key("old"), "old", scope(), [1.0, 0.0])
+    now[0] += 61
+    cache.put(key("new"), "new", scope(), [0.0, 1.0])
+
+    assert cache.lookup(key("rephrased"), scope(), [1.0, 0.0]) is None
+    assert cache.lookup(key("rephrased"), scope(), [0.0, 1.0]) == "new"
+
+
+def test_put_over_an_existing_key_moves_it_between_scopes():
+    cache = ResponseCache(semantic_threshold=0.95)
+    cache.put(key("q"), "a", scope("p1"), [1.0, 0.0])
+    cache.put(key("q"), "b", scope("p2"), [1.0, 0.0])
+
+    assert cache.lookup(key("other"), scope("p1"), [1.0, 0.0]) is None
+    assert cache.lookup(key("other"), scope("p2"), [1.0, 0.0]) == "b"
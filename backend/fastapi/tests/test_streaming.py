@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+from streaming import ThinkFilter, partial_tag_length, sse_event
+
+REPLY = "<think>\nweigh basal vs bolus\n</think>\n\nIncrease basal by 2 units."
+
+
+def run_filter(chunks):
+    think = ThinkFilter()
+    return "".join(think.feed(chunk) for chunk in chunks) + think.flush()
+
+
+def test_sse_event_format():
+    assert sse_event({"token": "hi"}) == 'data: {"token": "hi"}\n\n'
+    assert sse_event({}, event="done") == "event: done\ndata: {}\n\n"
+    assert json.loads(sse_event({"token": "é"}).split("data: ")[1]) == {"token": "é"}
+
+
+def test_partial_tag_length():
+    assert partial_tag_length("abc<th", "<think>") == 3
+    assert partial_tag_length("abc", "<think>") == 0
+    assert partial_tag_length("<think>", "<think>") == 0
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 8, len(REPLY)])
+def test_think_block_stripped_at_any_chunking(size):
+    chunks = [REPLY[i:i + size] for i in range(0, len(REPLY), size)]
+    assert run_filter(chunks) == REPLY.split("</think>")[-1].strip()
+
+
+def test_reply_without_think_passes_through():
+    # Leading whitespace is dropped; trailing whitespace already streamed can't be taken back
+    assert run_filter(["  Plain ", "answer", " <b>ok</b>"]) == "Plain answer <b>ok</b>"
+
+
+def test_unclosed_think_is_dropped():
+    assert run_filter(["Answer first.", "<think>never closed"]) == "Answer first."
+
+
+def test_text_resembling_a_tag_is_released_on_flush():
+    assert run_filter(["value <th"]) == "value <th"
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, 64])
+def test_reasoning_without_opening_tag_is_dropped(size):
+    # The R1 chat template puts <think> in the prompt, so the reply only closes it
+    reply = "reasoning here</think>Answer"
+    chunks = [reply[i:i + size] for i in range(0, len(reply), size)]
+    assert run_filter(chunks) == reply.split("</think>")[-1].strip() == "Answer"
+
+
+def test_later_think_block_after_bare_close_is_dropped():
+    assert run_filter(["plan</think>\n\nStep one. ", "<think>again</think>Step two."]) == "Step one. Step two."
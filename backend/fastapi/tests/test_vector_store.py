@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from vector_store import LocalVectorIndex, kmeans, normalize_rows, top_k_indices
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    rng = np.random.default_rng(7)
+    vectors = rng.standard_normal((400, 32)).astype(np.float32)
+    ids = [f"chunk-{i}" for i in range(len(vectors))]
+    metadata = [{"text": f"passage {i}"} for i in range(len(vectors))]
+    LocalVectorIndex.save(str(tmp_path), ids, vectors, metadata)
+    return tmp_path, normalize_rows(vectors)
+
+
+def brute_force(vectors, query, k):
+    scores = vectors @ normalize_rows(query)
+    return list(np.argsort(-scores)[:k])
+
+
+def test_top_k_indices_sorted_and_bounded():
+    scores = np.array([0.1, 0.9, 0.5, 0.7])
+    assert list(top_k_indices(scores, 2)) == [1, 3]
+    assert list(top_k_indices(scores, 10)) == [1, 3, 2, 0]
+    assert len(top_k_indices(scores, 0)) == 0
+
+
+def test_exact_search_matches_brute_force(corpus):
+    directory, vectors = corpus
+    index = LocalVectorIndex.load(str(directory))
+    query = vectors[42] + 0.01
+
+    rows, scores = index.search(query, top_k=5)
+
+    assert list(rows) == brute_force(vectors, query, 5)
+    assert scores[0] == pytest.approx(float(vectors[42] @ normalize_rows(query)), rel=1e-5)
+    assert isinstance(index.embeddings, np.memmap)
+
+
+def test_query_has_pinecone_shape(corpus):
+    directory, vectors = corpus
+    result = LocalVectorIndex.load(str(directory)).query(vectors[3].tolist(), top_k=2)
+
+    assert [m["id"] for m in result["matches"]][0] == "chunk-3"
+    assert result["matches"][0]["metadata"] == {"text": "passage 3"}
+    assert isinstance(result["matches"][0]["score"], float)
+
+
+@pytest.mark.parametrize("quantize", [False, True])
+def test_ivf_finds_the_query_row(corpus, quantize):
+    directory, vectors = corpus
+    LocalVectorIndex.build_ivf(str(directory), n_lists=8, quantize=quantize)
+    index = LocalVectorIndex.load(str(directory), nprobe=8)
+
+    # Probing every list makes IVF exact, int8 codes only pick the shortlist
+    for row in (0, 123, 399):
+        rows, _ = index.search(vectors[row], top_k=3)
+        assert rows[0] == row
+        assert list(rows) == brute_force(vectors, vectors[row], 3)
+
+
+def test_kmeans_centroids_are_unit_norm(corpus):
+    _, vectors = corpus
+    centroids = kmeans(vectors, 4, iters=3)
+    assert centroids.shape == (4, 32)
+    assert np.allclose(np.linalg.norm(centroids, axis=1), 1, atol=1e-5)
+
+
+def test_load_rejects_mismatched_metadata(corpus):
+    directory, _ = corpus
+    with open(directory / "metadata.jsonl", "a") as f:
+        f.write('{"id": "extra"}\n')
+    with pytest.raises(ValueError):
+        LocalVectorIndex.load(str(directory))
@@ -0,0 +1,77 @@
+"""Snapshot the Pinecone index into the LocalVectorIndex format, or restore it.
+
+    python vector_snapshot.py export vector_index --ivf-lists 256 --quantize
+    python vector_snapshot.py import vector_index
+
+Set RETRIEVER_BACKEND=local and LOCAL_INDEX_DIR=vector_index to serve
+retrieve_context from the snapshot instead of Pinecone.
+"""
+import argparse
+import os
+
+from pinecone import Pinecone
+
+from vector_store import EMBEDDINGS_FILE, LocalVectorIndex
+
+FETCH_BATCH = 100
+
+
+def export_index(index, directory, namespace=None):
+    ids, vectors, metadata = [], [], []
+
+    for page in index.list(namespace=namespace):
+        for start in range(0, len(page), FETCH_BATCH):
+            fetched = index.fetch(ids=page[start:start + FETCH_BATCH], namespace=namespace).vectors
+            for chunk_id, vector in fetched.items():
+                ids.append(chunk_id)
+                vectors.append(vector.values)
+                metadata.append(vector.metadata or {})
+        print(f"Fetched {len(ids)} vectors...")
+
+    LocalVectorIndex.save(directory, ids, vectors, metadata)
+    return len(ids)
+
+
+def import_index(index, directory, namespace=None):
+    local = LocalVectorIndex.load(directory, mmap=True)
+
+    for start in range(0, len(local), FETCH_BATCH):
+        rows = range(start, min(start + FETCH_BATCH, len(local)))
+        index.upsert(
+            vectors=[
+                {"id": local.ids[row], "values": local.embeddings[row].tolist(), "metadata": local.metadata[row]}
+                for row in rows
+            ],
+            namespace=namespace,
+        )
+        print(f"Upserted {rows.stop} / {len(local)} vectors...")
+
+    return len(local)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("directory")
+    parser.add_argument("--index", default="medicalbooks-1536")
+    parser.add_argument("--namespace", default=None)
+    parser.add_argument("--ivf-lists", type=int, default=0, help="Build an IVF index with this many lists (export only)")
+    parser.add_argument("--quantize", action="store_true", help="Store int8 codes alongside the IVF lists (export only)")
+    args = parser.parse_args()
+
+    index = Pinecone(api_key=os.getenv("PINECONE_API_KEY")).Index(args.index)
+
+    if args.command == "import":
+        count = import_index(index, args.directory, args.namespace)
+        print(f"✅ Restored {count} vectors into {args.index}")
+        return
+
+    count = export_index(index, args.directory, args.namespace)
+    if args.ivf_lists:
+        LocalVectorIndex.build_ivf(args.directory, args.ivf_lists, quantize=args.quantize)
+    size_mb = os.path.getsize(os.path.join(args.directory, EMBEDDINGS_FILE)) / 2**20
+    print(f"✅ Exported {count} vectors from {args.index} to {args.directory} ({size_mb:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
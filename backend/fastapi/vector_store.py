@@ -0,0 +1,141 @@
+import json
+import os
+
+import numpy as np
+
+EMBEDDINGS_FILE = "embeddings.npy"
+METADATA_FILE = "metadata.jsonl"
+IVF_FILE = "ivf.npz"
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    k = min(k, len(scores))
+    if k == 0:
+        return np.empty(0, dtype=np.int64)
+    best = np.argpartition(-scores, k - 1)[:k]
+    return best[np.argsort(-scores[best])]
+
+
+def kmeans(vectors: np.ndarray, n_clusters: int, iters=10, seed=0, block=65536) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].astype(np.float32)
+
+    for _ in range(iters):
+        sums = np.zeros_like(centroids)
+        counts = np.zeros(n_clusters, dtype=np.int64)
+        for start in range(0, len(vectors), block):
+            chunk = np.asarray(vectors[start:start + block], dtype=np.float32)
+            labels = np.argmax(chunk @ centroids.T, axis=1)
+            np.add.at(sums, labels, chunk)
+            counts += np.bincount(labels, minlength=n_clusters)
+        # Empty clusters keep their previous centroid
+        filled = counts > 0
+        centroids[filled] = normalize_rows(sums[filled] / counts[filled, None])
+
+    return centroids
+
+
+class LocalVectorIndex:
+    """In-process cosine index over a snapshot of the medical-book corpus.
+
+    A snapshot directory holds ``embeddings.npy`` (float32, one unit-norm
+    row per chunk, memory-mapped on load) and ``metadata.jsonl`` (one
+    ``{"id", "metadata"}`` object per row). Queries are exact by default.
+    If ``ivf.npz`` is present, only the ``nprobe`` nearest inverted lists
+    are scanned. Optional int8 codes are reranked against the float rows.
+    """
+
+    def __init__(self, embeddings, ids, metadata, ivf=None, nprobe=8):
+        self.embeddings = embeddings
+        self.ids = ids
+        self.metadata = metadata
+        self.ivf = ivf
+        self.nprobe = nprobe
+
+    @classmethod
+    def load(cls, directory, nprobe=8, mmap=True):
+        embeddings = np.load(os.path.join(directory, EMBEDDINGS_FILE), mmap_mode="r" if mmap else None)
+
+        ids, metadata = [], []
+        with open(os.path.join(directory, METADATA_FILE), encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                ids.append(record["id"])
+                metadata.append(record.get("metadata", {}))
+
+        if len(ids) != len(embeddings):
+            raise ValueError(f"{directory}: {len(embeddings)} embeddings but {len(ids)} metadata rows")
+
+        ivf_path = os.path.join(directory, IVF_FILE)
+        ivf = dict(np.load(ivf_path)) if os.path.exists(ivf_path) else None
+        return cls(embeddings, ids, metadata, ivf=ivf, nprobe=nprobe)
+
+    @staticmethod
+    def save(directory, ids, vectors, metadata):
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, EMBEDDINGS_FILE), normalize_rows(np.asarray(vectors, dtype=np.float32)))
+        with open(os.path.join(directory, METADATA_FILE), "w", encoding="utf-8") as f:
+            for chunk_id, meta in zip(ids, metadata):
+                f.write(json.dumps({"id": chunk_id, "metadata": meta}) + "\n")
+
+    @staticmethod
+    def build_ivf(directory, n_lists, quantize=False, iters=10):
+        embeddings = np.load(os.path.join(directory, EMBEDDINGS_FILE), mmap_mode="r")
+        n_lists = min(n_lists, len(embeddings))
+        centroids = kmeans(embeddings, n_lists, iters=iters)
+
+        labels = np.concatenate([
+            np.argmax(np.asarray(embeddings[start:start + 65536]) @ centroids.T, axis=1)
+            for start in range(0, len(embeddings), 65536)
+        ])
+        order = np.argsort(labels, kind="stable").astype(np.int64)
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(labels, minlength=n_lists))]).astype(np.int64)
+
+        arrays = {"centroids": centroids, "order": order, "offsets": offsets}
+        if quantize:
+            scales = np.abs(embeddings).max(axis=1).astype(np.float32) / 127
+            scales[scales == 0] = 1
+            arrays["codes"] = np.round(embeddings / scales[:, None]).astype(np.int8)
+            arrays["scales"] = scales
+        np.savez(os.path.join(directory, IVF_FILE), **arrays)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _candidates(self, query: np.ndarray) -> np.ndarray:
+        lists = top_k_indices(self.ivf["centroids"] @ query, self.nprobe)
+        offsets, order = self.ivf["offsets"], self.ivf["order"]
+        return np.concatenate([order[offsets[i]:offsets[i + 1]] for i in lists])
+
+    def search(self, vector, top_k=3):
+        query = normalize_rows(np.asarray(vector, dtype=np.float32))
+
+        if self.ivf is None:
+            scores = self.embeddings @ query
+            best = top_k_indices(scores, top_k)
+            return best, scores[best]
+
+        rows = np.sort(self._candidates(query))
+        if "codes" in self.ivf:
+            # Coarse int8 scores pick a shortlist that is rescored exactly
+            coarse = (self.ivf["codes"][rows] @ query) * self.ivf["scales"][rows]
+            rows = np.sort(rows[top_k_indices(coarse, top_k * 4)])
+
+        scores = self.embeddings[rows] @ query
+        best = top_k_indices(scores, top_k)
+        return rows[best], scores[best]
+
+    def query(self, vector, top_k=3) -> dict:
+        # Same shape as a Pinecone query response with include_metadata=True
+        rows, scores = self.search(vector, top_k)
+        return {
+            "matches": [
+                {"id": self.ids[row], "score": float(score), "metadata": self.metadata[row]}
+                for row, score in zip(rows, scores)
+            ]
+        }
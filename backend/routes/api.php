@@ -10,6 +10,7 @@
 Route::post('/register', [AuthController::class, 'register']);
 Route::post('/login', [AuthController::class, 'login']);
 Route::post('/predict', [RiskPredictionController::class, 'predict']);
+Route::post('/predict/batch', [RiskPredictionController::class, 'predictBatch']);
 Route::post('/patients', [PatientController::class, 'store']);
 Route::post('/chatbot/message', [ChatbotController::class, 'message']);
 Route::put('/patients/{id}', [PatientController::class, 'update']);